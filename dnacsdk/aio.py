@@ -0,0 +1,299 @@
+"""Sample usage
+import asyncio
+from dnacsdk.aio import AsyncApi
+from dnacsdk.wlan import Wlan
+from dnacsdk.profile import Profile
+
+async def main():
+    async with AsyncApi(ip=DNAC_IP, username=DNAC_USERNAME, password=DNAC_PASSWORD) as dnacp:
+        wlans, profiles = await asyncio.gather(
+            Wlan.get_all_async(dnacp),
+            Profile.get_all_async(dnacp, prefetch_sites = True)
+        )
+
+asyncio.get_event_loop().run_until_complete(main())
+
+Requires the optional aiohttp package.
+"""
+import asyncio
+import datetime
+import logging
+import time
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from . import util
+from . import exceptions
+from . import stream
+from .api import Api
+
+
+class ResponseInfo(object):
+    """Status line and headers of an aiohttp response, shaped like the
+    requests response that Api.handle_response and the exceptions expect.
+    """
+
+    def __init__(self, response):
+        self.status_code = response.status
+        self.reason = response.reason
+        self.headers = response.headers
+
+    def get(self, name, default=None):
+        return self.headers.get(name, default)
+
+
+class AsyncApi(Api):
+    """asyncio counterpart of Api.
+
+    get/post/put/delete are coroutines. Options, token handling (expiry,
+    refresh margin, token_cache), the response cache and the error mapping
+    of handle_response are the same as Api. At most ``concurrency``
+    connections (default 100) are open at once. An AsyncApi belongs to one
+    event loop and is not meant to be shared across threads. token_cache
+    file I/O runs in the loop's default executor.
+
+    Resource methods without an _async counterpart (e.g. Profile.sites,
+    NetworkDevice.iter_all, Template.info) need a blocking Api and raise
+    TypeError when given an AsyncApi.
+    """
+
+    is_async = True
+
+    def __init__(self, **kwargs):
+        if aiohttp is None:
+            raise exceptions.MissingConfig("AsyncApi requires the aiohttp package")
+        super(AsyncApi, self).__init__(**kwargs)
+        self.concurrency = kwargs.get("concurrency", 100)
+        self.token_alock = None
+
+    def new_session(self):
+        """The aiohttp session is created on first use, inside the event loop
+        """
+        return None
+
+    def async_session(self):
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.concurrency, ssl=False)
+            self.session = aiohttp.ClientSession(connector=connector)
+        return self.session
+
+    async def aclose(self):
+        """Close the aiohttp session and release its connections
+        """
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def close(self):
+        raise TypeError("AsyncApi must be closed with 'await api.aclose()'")
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.aclose()
+
+    async def get_token(self):
+        """Return a valid token, requesting a new one when needed. Only one
+        coroutine refreshes; the others wait for it.
+        """
+        token = self.token
+        if token is not None and not self.token_expiring():
+            return token
+
+        if self.token_alock is None:
+            self.token_alock = asyncio.Lock()
+        async with self.token_alock:
+            self.validate_token()
+            if self.token is None and self.token_cache is not None:
+                await self.run_blocking(self.load_cached_token)
+            if self.token is None:
+                await self.refresh_token()
+                if self.token_cache is not None:
+                    await self.run_blocking(self.store_cached_token)
+            return self.token
+
+    async def invalidate_token(self, token_value=None):
+        """Coroutine counterpart of Api.invalidate_token. Needs no lock on
+        the event loop; the token_cache entry is discarded in the executor.
+        """
+        if self.token is None:
+            return
+        if token_value is None or self.token.get("Token") == token_value:
+            self.token = None
+            self.token_expires_at = None
+            if self.token_cache is not None:
+                await self.run_blocking(self.token_cache.discard, self.ip, self.username)
+
+    async def run_blocking(self, function, *args):
+        """Run blocking work, such as token_cache file I/O, in the event
+        loop's default executor
+        """
+        return await asyncio.get_event_loop().run_in_executor(None, function, *args)
+
+    async def refresh_token(self):
+        requested_at = time.time()
+        token = await self.http_call(util.join_url(self.endpoint, self.token_path), "POST",
+                                     data="{}", auth=aiohttp.BasicAuth(self.username, self.password),
+                                     retry=True)
+        return self.set_token(token, requested_at)
+
+    async def headers(self):
+        return self.auth_headers(await self.get_token())
+
+    async def http_call(self, url, method, retry=None, **kwargs):
+        """Makes a http call, retrying transient failures according to the
+        retry policy. Logs response information.
+        """
+        policy = self.retry
+        deadline = policy.start()
+        attempt = 0
+
+        while True:
+            attempt += 1
+            logging.info('Request[%s]: %s' % (method, url))
+            start_time = datetime.datetime.now()
+
+            if self.rate_limit is not None:
+                ticket = await self.rate_limit.acquire_async(url)
+            timeout = util.min_timeout(self.timeout, policy.remaining(deadline))
+            try:
+                async with self.async_session().request(
+                        method, url, timeout=aiohttp.ClientTimeout(total=timeout), **kwargs) as response:
+                    content = await response.read()
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as error:
+                if self.rate_limit is not None:
+                    self.rate_limit.release(None, ticket)
+                delay = policy.next_delay(method, attempt, deadline, retry=retry)
+                if delay is None:
+                    raise
+                logging.warning('Request[%s]: %s failed (%r), retrying in %.2fs' % (method, url, error, delay))
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                if self.rate_limit is not None:
+                    self.rate_limit.cancel()
+                raise
+            if self.rate_limit is not None:
+                self.rate_limit.release(response.status, ticket)
+
+            duration = datetime.datetime.now() - start_time
+            logging.info('Response[%d]: %s, Duration: %s.%ss.' % (
+            response.status, response.reason, duration.seconds, duration.microseconds))
+
+            if response.status in policy.statuses:
+                delay = policy.next_delay(method, attempt, deadline, response.headers, retry)
+                if delay is not None:
+                    logging.warning('Response[%d]: %s, retrying in %.2fs' % (response.status, url, delay))
+                    await asyncio.sleep(delay)
+                    continue
+
+            return self.handle_response(ResponseInfo(response), content)
+
+    async def get(self, action, headers=None, bypass_cache=False):
+        use_cache = self.cache is not None and not bypass_cache and not headers
+        if use_cache:
+            hit, response = self.cache.get(action)
+            if hit:
+                return response
+
+        http_headers = util.merge_dict(await self.headers(), headers or {})
+
+        response = await self.request(util.join_url(self.endpoint, action), 'GET', headers=http_headers)
+        if use_cache and not (isinstance(response, dict) and "error" in response):
+            self.cache.set(action, response)
+        return response
+
+    async def get_stream(self, action, headers=None, key="response", chunk_size=65536):
+        """Async generator counterpart of Api.get_stream. The call is rate
+        limited but not retried, and timeout applies to each read. As with
+        Api.get_stream, the rate limiter slot is given back when the headers
+        arrive, not when the body has been read.
+        """
+        url = util.join_url(self.endpoint, action)
+        http_headers = util.merge_dict(await self.headers(), headers or {})
+        retry_auth = bool(self.username and self.password)
+
+        while True:
+            if self.rate_limit is not None:
+                ticket = await self.rate_limit.acquire_async(url)
+            try:
+                response = await self.async_session().get(url, headers=http_headers,
+                    timeout=aiohttp.ClientTimeout(sock_connect=self.timeout, sock_read=self.timeout))
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if self.rate_limit is not None:
+                    self.rate_limit.release(None, ticket)
+                raise
+            except BaseException:
+                if self.rate_limit is not None:
+                    self.rate_limit.cancel()
+                raise
+            if self.rate_limit is not None:
+                self.rate_limit.release(response.status, ticket)
+
+            try:
+                if response.status == 401 and retry_auth:
+                    retry_auth = False
+                    await self.invalidate_token(http_headers.get("X-Auth-Token"))
+                    http_headers = util.merge_dict(http_headers, {"X-Auth-Token": (await self.get_token())["Token"]})
+                    continue
+                if not 200 <= response.status <= 299:
+                    self.handle_response(ResponseInfo(response), await response.text(encoding='utf-8'))
+
+                parser = stream.ItemParser(key)
+                async for chunk in response.content.iter_chunked(chunk_size):
+                    for item in parser.feed(chunk):
+                        yield item
+                for item in parser.close():
+                    yield item
+                return
+            finally:
+                response.release()
+
+    async def post(self, action, params=None, headers=None, retry=None):
+        http_headers = util.merge_dict(await self.headers(), headers or {})
+        response = None
+        try:
+            response = await self.request(util.join_url(self.endpoint, action), 'POST', body=params or {}, headers=http_headers, retry=retry)
+            return response
+        finally:
+            self.invalidate_cache('POST', action, response)
+
+    async def put(self, action, params=None, headers=None):
+        http_headers = util.merge_dict(await self.headers(), headers or {})
+        response = None
+        try:
+            response = await self.request(util.join_url(self.endpoint, action), 'PUT', body=params or {}, headers=http_headers)
+            return response
+        finally:
+            self.invalidate_cache('PUT', action, response)
+
+    async def delete(self, action, headers=None):
+        http_headers = util.merge_dict(await self.headers(), headers or {})
+        response = None
+        try:
+            response = await self.request(util.join_url(self.endpoint, action), 'DELETE', headers=http_headers)
+            return response
+        finally:
+            self.invalidate_cache('DELETE', action, response)
+
+    async def request(self, url, method, body=None, headers=None, retry_auth=True, retry=None):
+        """Make HTTP call, formats response and does error handling.
+        """
+        headers = headers or {}
+        try:
+            return await self.http_call(url, method, data=self.codec.dumps(body), headers=headers, retry=retry)
+
+        except exceptions.BadRequest as error:
+            return {"error": self.codec.loads(error.content)}
+
+        except exceptions.UnauthorizedAccess as error:
+            if retry_auth and self.username and self.password:
+                await self.invalidate_token(headers.get("X-Auth-Token"))
+                headers = util.merge_dict(headers, {"X-Auth-Token": (await self.get_token())["Token"]})
+                return await self.request(url, method, body, headers, retry_auth=False, retry=retry)
+            else:
+                raise error
@@ -1,18 +1,66 @@
-import json
+import collections
+import contextlib
 import requests
-import util as util
-import exceptions
+from requests.adapters import HTTPAdapter
+from . import util
+from . import exceptions
+from . import stream
+from .token_cache import TokenCache
+from .cache import ResponseCache
+from .retry import RetryPolicy, NO_RETRY
+from .ratelimit import RateLimiter
+from .codec import get_codec
 import datetime
 import logging
-import jwt
+import threading
+import time
 
 class Api(object):
+    """Client for the DNA Center REST API.
+
+    Thread safety: one Api may be shared by any number of threads, e.g. the
+    workers of a concurrent.futures.ThreadPoolExecutor.
+        * Token state is guarded by token_lock. When the token expires or is
+          rejected exactly one thread requests a new one; the others wait and
+          reuse it.
+        * All threads share one connection pool of ``pool_size`` connections.
+          With ``pool_block`` (the default) a thread waits for a free
+          connection instead of opening an extra one that is thrown away,
+          so size the pool to the number of worker threads.
+        * The response cache, DeviceIndex and TemplateCatalog are locked.
+        * close() must only be called once no thread is using the Api.
+    Resource objects (NetworkDevice, Profile, ...) are not locked; do not
+    mutate one object from several threads.
+    """
+
+    # True for AsyncApi, whose calls are coroutines
+    is_async = False
 
     def __init__(self, **kwargs):
         """Create API object
         Usage::
             >>> import languages.python.scratch
             >>> api = dnacsdk.Api(ip="10.195.153.140", username='admin', password='Grapevine1')
+
+        All requests share one pooled, keep-alive HTTP session. The pool
+        holds up to ``pool_size`` connections (default 10). Call ``close()``
+        when done, or use the object as a context manager::
+            >>> with dnacsdk.Api(ip="10.195.153.140", username='admin', password='Grapevine1') as api:
+            ...     devices = NetworkDevice.get_all(api)
+
+        Pass ``token_cache`` (a file path or TokenCache) to share tokens
+        between processes until they expire, and ``cache`` (a ResponseCache,
+        or True for the defaults) to reuse GET responses.
+
+        Transient failures are retried according to ``retry`` (a RetryPolicy,
+        False to disable). ``timeout`` limits each attempt in seconds.
+        ``rate_limit`` (a RateLimiter, or True for the defaults) throttles
+        calls per endpoint family and backs off when the controller answers
+        429 or 503.
+
+        Bodies are encoded and decoded as bytes by ``codec`` (a codec object
+        or "json"/"orjson"); by default orjson when it is installed, else the
+        standard library.
         """
 
         self.ip = kwargs["ip"]  # Mandatory parameter
@@ -20,41 +68,169 @@ class Api(object):
         self.password = kwargs["password"]
         self.token = None
         self.token_request_at = None
+        self.token_expires_at = None
+        self.token_lifetime = kwargs.get("token_lifetime", 3600)
+        self.token_refresh_margin = kwargs.get("token_refresh_margin", 60)
+        self.token_lock = threading.Lock()
+        self.codec = get_codec(kwargs.get("codec"))
+        self.token_cache = kwargs.get("token_cache")
+        if self.token_cache is not None and not isinstance(self.token_cache, TokenCache):
+            self.token_cache = TokenCache(self.token_cache)
+        self.cache = kwargs.get("cache")
+        if self.cache is True:
+            self.cache = ResponseCache(sizeof=lambda value: len(self.codec.dumps(value)))
+        self.retry = kwargs.get("retry")
+        if self.retry is None:
+            self.retry = RetryPolicy()
+        elif self.retry is False:
+            self.retry = NO_RETRY
+        self.timeout = kwargs.get("timeout")
+        self.rate_limit = kwargs.get("rate_limit")
+        if self.rate_limit is True:
+            self.rate_limit = RateLimiter()
         self.options = kwargs
         self.endpoint = 'https://'+self.ip
+        self.pool_size = kwargs.get("pool_size", 10)
+        self.pool_block = kwargs.get("pool_block", True)
+        self.session_lock = threading.Lock()
+        self.session = self.new_session()
+        self.write_listeners = []
+        self.task_writes = collections.OrderedDict()
+
+    def new_session(self):
+        """Create the pooled HTTP session used for every call
+        """
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size,
+                              pool_block=self.pool_block)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update({"Connection": "keep-alive"})
+        return session
+
+    def close(self):
+        """Close the HTTP session and release pooled connections
+        """
+        with self.session_lock:
+            if self.session is not None:
+                self.session.close()
+                self.session = None
+
+    def http_session(self):
+        """Return the shared session, re-creating it after close()
+        """
+        session = self.session
+        if session is None:
+            with self.session_lock:
+                if self.session is None:
+                    self.session = self.new_session()
+                session = self.session
+        return session
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
     def get_token(self):
-        """Generate new token by making a POST request
-            1. By using client credentials if validate_token_hash finds
-            token to be invalid.
+        """Return a valid token, requesting a new one when needed.
+            1. The cached token is reused until token_refresh_margin seconds
+            before its expiry.
+            2. Only one caller refreshes; concurrent callers wait for it and
+            reuse the new token.
+            3. With a token_cache, a valid token left by another process is
+            reused before requesting a new one.
+        """
+        token = self.token
+        if token is not None and not self.token_expiring():
+            return token
+
+        with self.token_lock:
+            self.validate_token()
+            if self.token is None:
+                self.load_cached_token()
+            if self.token is None:
+                self.refresh_token()
+                self.store_cached_token()
+            return self.token
+
+    token_path = "/api/system/v1/auth/token"
+
+    def refresh_token(self):
+        """Request a new token by making a POST request with the client
+        credentials.
         """
-        path = "/api/system/v1/auth/token"
         payload={}
 
         authentication = (self.username, self.password)
 
-    #   self.validate_token()
-        if self.token is not None:
-            return self.token
-        else:
-            self.token = self.http_call(util.join_url(self.endpoint, path), "POST",verify=False, data=payload, auth=authentication)
+        requested_at = time.time()
+        token = self.http_call(util.join_url(self.endpoint, self.token_path), "POST",verify=False, data=payload, auth=authentication, retry=True)
+
+        return self.set_token(token, requested_at)
+
+    def set_token(self, token, requested_at):
+        """Store a new token. Reads its expiry from the JWT exp claim.
+        """
+        expires_at = util.jwt_claims(token.get("Token", "")).get("exp")
+        if expires_at is None:
+            expires_at = requested_at + self.token_lifetime
+
+        self.token_request_at = requested_at
+        self.token_expires_at = expires_at
+        self.token = token
+        return token
+
+    def load_cached_token(self):
+        """Adopt a still valid token from the token_cache, if any
+        """
+        if self.token_cache is None:
+            return
+        cached = self.token_cache.load(self.ip, self.username, self.token_refresh_margin)
+        if cached is not None:
+            self.token_expires_at = cached[1]
+            self.token = cached[0]
 
-        return self.token
+    def store_cached_token(self):
+        if self.token_cache is not None:
+            self.token_cache.store(self.ip, self.username, self.token, self.token_expires_at)
+
+    def token_expiring(self):
+        """True when the token is within token_refresh_margin of expiring
+        """
+        if self.token_expires_at is None:
+            return False
+        return time.time() >= self.token_expires_at - self.token_refresh_margin
 
     def validate_token(self):
         """Checks if token has expired and if so resets token
         """
-        if self.token_request_at and self.token is not None:
-            current = datetime.datetime.now()
-            expires_in = jwt.decode(self.token, 'secret', options=None)
-            if current >= expires_in:
+        if self.token is not None and self.token_expiring():
+            self.token = None
+
+    def invalidate_token(self, token_value=None):
+        """Drop the cached token. With token_value, only drop it if it is
+        still the current token, so a token another caller already
+        refreshed is kept.
+        """
+        with self.token_lock:
+            if self.token is None:
+                return
+            if token_value is None or self.token.get("Token") == token_value:
                 self.token = None
+                self.token_expires_at = None
+                if self.token_cache is not None:
+                    self.token_cache.discard(self.ip, self.username)
 
     def headers(self):
         """Default HTTP headers
         """
-        token = self.get_token()
+        return self.auth_headers(self.get_token())
 
+    def auth_headers(self, token):
+        """HTTP headers for a given token
+        """
         logging.info("Token is:"+str(token['Token']))
 
         return {
@@ -63,31 +239,71 @@ class Api(object):
             "Accept": "application/json"
         }
 
-    def http_call(self, url, method, **kwargs):
-        """Makes a http call. Logs response information.
+    def http_call(self, url, method, retry=None, **kwargs):
+        """Makes a http call, retrying transient failures according to the
+        retry policy. Logs response information.
+        retry=True/False overrides whether this method may be retried.
         """
-        logging.info('Request[%s]: %s' % (method, url))
-        start_time = datetime.datetime.now()
+        policy = self.retry
+        deadline = policy.start()
+        attempt = 0
+
+        while True:
+            attempt += 1
+            logging.info('Request[%s]: %s' % (method, url))
+            start_time = datetime.datetime.now()
 
-        logging.info("Method:"+method);
-        logging.info("URL:" + url);
+            if self.rate_limit is not None:
+                ticket = self.rate_limit.acquire(url)
+            timeout = util.min_timeout(self.timeout, policy.remaining(deadline))
+            try:
+                response = self.http_session().request(method, url, timeout=timeout, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as error:
+                if self.rate_limit is not None:
+                    self.rate_limit.release(None, ticket)
+                delay = policy.next_delay(method, attempt, deadline, retry=retry)
+                if delay is None:
+                    raise
+                logging.warning('Request[%s]: %s failed (%s), retrying in %.2fs' % (method, url, error, delay))
+                time.sleep(delay)
+                continue
+            except Exception:
+                if self.rate_limit is not None:
+                    self.rate_limit.cancel()
+                raise
+            # The rate limiter slot is released once the headers are in,
+            # also for stream=True, see get_stream
+            if self.rate_limit is not None:
+                self.rate_limit.release(response.status_code, ticket)
 
-        response = requests.request(method, url, **kwargs)
+            duration = datetime.datetime.now() - start_time
+            logging.info('Response[%d]: %s, Duration: %s.%ss.' % (
+            response.status_code, response.reason, duration.seconds, duration.microseconds))
 
-        duration = datetime.datetime.now() - start_time
-        logging.info('Response[%d]: %s, Duration: %s.%ss.' % (
-        response.status_code, response.reason, duration.seconds, duration.microseconds))
+            if response.status_code in policy.statuses:
+                delay = policy.next_delay(method, attempt, deadline, response.headers, retry)
+                if delay is not None:
+                    logging.warning('Response[%d]: %s, retrying in %.2fs' % (response.status_code, url, delay))
+                    response.close()
+                    time.sleep(delay)
+                    continue
 
-        return self.handle_response(response, response.content.decode('utf-8'))
+            # stream=True hands a successful response over unread
+            if kwargs.get('stream') and 200 <= response.status_code <= 299:
+                return response
+            return self.handle_response(response, response.content)
 
     def handle_response(self, response, content):
-        """Validate HTTP response
+        """Validate HTTP response. content is the raw body; successful
+        bodies are decoded with the codec, error bodies passed on as text.
         """
         status = response.status_code
+        if 200 <= status <= 299:
+            return self.codec.loads(content) if content else {}
+        if isinstance(content, bytes):
+            content = content.decode('utf-8', 'replace')
         if status in (301, 302, 303, 307):
             raise exceptions.Redirection(response, content)
-        elif 200 <= status <= 299:
-            return json.loads(content) if content else {}
         elif status == 400:
             raise exceptions.BadRequest(response, content)
         elif status == 401:
@@ -104,6 +320,8 @@ class Api(object):
             raise exceptions.ResourceGone(response, content)
         elif status == 422:
             raise exceptions.ResourceInvalid(response, content)
+        elif status == 429:
+            raise exceptions.TooManyRequests(response, content)
         elif 401 <= status <= 499:
             raise exceptions.ClientError(response, content)
         elif 500 <= status <= 599:
@@ -111,57 +329,152 @@ class Api(object):
         else:
             raise exceptions.ConnectionError(response, content, "Unknown response code: #{response.code}")
 
-    def get(self, action, headers=None):
-        """Make GET request
+    def get(self, action, headers=None, bypass_cache=False):
+        """Make GET request. Served from the response cache when one is
+        configured, unless bypass_cache is set.
         Usage::
             >>> api.get("v1/payments/payment?count=1")
-            >>> api.get("v1/payments/payment/PAY-1234")
+            >>> api.get("v1/payments/payment/PAY-1234", bypass_cache=True)
+        """
+        use_cache = self.cache is not None and not bypass_cache and not headers
+        if use_cache:
+            hit, response = self.cache.get(action)
+            if hit:
+                return response
+
+        http_headers = util.merge_dict(self.headers(), headers or {})
+
+        response = self.request(util.join_url(self.endpoint, action), 'GET', headers=http_headers or {})
+        if use_cache and not (isinstance(response, dict) and "error" in response):
+            self.cache.set(action, response)
+        return response
+
+    def get_stream(self, action, headers=None, key="response", chunk_size=65536):
+        """Make GET request and yield the items of response[key] as they are
+        read off the connection, without holding the whole body in memory.
+        Bypasses the response cache. Errors are raised like get() would,
+        on the first next().
+
+        The rate limiter slot is given back as soon as the response headers
+        arrive, so the caller may make other calls with this Api while it
+        iterates (e.g. reading each device's interfaces). Only the pooled
+        connection stays held until the generator is exhausted or closed,
+        which is why such nested calls need pool_size of at least 2.
+        Usage::
+            >>> for device in api.get_stream("/api/v1/network-device"):
+            ...     print(device["hostname"])
         """
+        url = util.join_url(self.endpoint, action)
         http_headers = util.merge_dict(self.headers(), headers or {})
+        try:
+            response = self.http_call(url, 'GET', verify=False, headers=http_headers, stream=True)
+        except exceptions.UnauthorizedAccess:
+            if not (self.username and self.password):
+                raise
+            self.invalidate_token(http_headers.get("X-Auth-Token"))
+            http_headers = util.merge_dict(http_headers, {"X-Auth-Token": self.get_token()["Token"]})
+            response = self.http_call(url, 'GET', verify=False, headers=http_headers, stream=True)
 
-        return self.request(util.join_url(self.endpoint, action), 'GET', headers=http_headers or {})
+        with contextlib.closing(response):
+            for item in stream.iter_items(response.iter_content(chunk_size), key):
+                yield item
 
-    def post(self, action, params=None, headers=None):
-        """Make POST request
+    def post(self, action, params=None, headers=None, retry=None):
+        """Make POST request. POSTs are only retried with retry=True.
         Usage::
             >>> api.post("v1/payments/payment", { 'indent': 'sale' })
-            >>> api.post("v1/payments/payment/PAY-1234/execute", { 'payer_id': '1234' })
+            >>> api.post("v1/payments/payment/PAY-1234/execute", { 'payer_id': '1234' }, retry=True)
         """
         http_headers = util.merge_dict(self.headers(), headers or {})
-        return self.request(util.join_url(self.endpoint, action), 'POST', body=params or {}, headers=http_headers or {})
+        response = None
+        try:
+            response = self.request(util.join_url(self.endpoint, action), 'POST', body=params or {}, headers=http_headers or {}, retry=retry)
+            return response
+        finally:
+            self.invalidate_cache('POST', action, response)
 
     def put(self, action, params=None, headers=None):
         """Make PUT request
         Usage::
             >>> api.put("v1/invoicing/invoices/INV2-RUVR-ADWQ", { 'id': 'INV2-RUVR-ADWQ', 'status': 'DRAFT'})
         """
-        return self.request(util.join_url(self.endpoint, action), 'PUT', body=params or {}, headers=headers or {})
+        http_headers = util.merge_dict(self.headers(), headers or {})
+        response = None
+        try:
+            response = self.request(util.join_url(self.endpoint, action), 'PUT', body=params or {}, headers=http_headers or {})
+            return response
+        finally:
+            self.invalidate_cache('PUT', action, response)
 
 
     def delete(self, action, headers=None):
         """Make DELETE request
         """
         http_headers = util.merge_dict(self.headers(), headers or {})
-        return self.request(util.join_url(self.endpoint, action), 'DELETE', headers=http_headers or {})
+        response = None
+        try:
+            response = self.request(util.join_url(self.endpoint, action), 'DELETE', headers=http_headers or {})
+            return response
+        finally:
+            self.invalidate_cache('DELETE', action, response)
 
-    def request(self, url, method, body=None, headers=None):
+    # Writes whose task has not been seen finishing yet, at most this many
+    max_task_writes = 1000
+
+    def invalidate_cache(self, method, action, response=None):
+        """Evict cached reads made stale by a write. Runs whether or not the
+        write succeeded, since a failed write may still have been applied.
+
+        When the response carries a taskId the change is applied later, and
+        a read in between caches the old state again, so the write is
+        remembered and evicted once more by task_finished().
+        """
+        if self.cache is not None:
+            self.cache.invalidate_for(method, action)
+        for listener in list(self.write_listeners):
+            listener(method, action)
+        if isinstance(response, dict) and isinstance(response.get("response"), dict) \
+                and "taskId" in response["response"]:
+            with self.session_lock:
+                self.task_writes[response["response"]["taskId"]] = (method, action)
+                while len(self.task_writes) > self.max_task_writes:
+                    self.task_writes.popitem(last=False)
+
+    def task_finished(self, taskId):
+        """Evict the cached reads made stale by the write that started
+        taskId, now that the controller has applied it
+        """
+        with self.session_lock:
+            write = self.task_writes.pop(taskId, None)
+        if write is not None:
+            self.invalidate_cache(*write)
+
+    def add_write_listener(self, listener):
+        """Call listener(method, action) after every POST, PUT and DELETE,
+        e.g. to drop in-memory state derived from earlier reads
+        """
+        self.write_listeners.append(listener)
+
+    def request(self, url, method, body=None, headers=None, retry_auth=True, retry=None):
         """Make HTTP call, formats response and does error handling. Uses http_call method in API class.
         Usage::
             >>> api.request("https://api.sandbox.paypal.com/v1/payments/payment?count=10", "GET", {})
             >>> api.request("https://api.sandbox.paypal.com/v1/payments/payment", "POST", "{}", {} )
         """
+        headers = headers or {}
         try:
-            return self.http_call(url, method, data=json.dumps(body), verify=False,headers=headers)
+            return self.http_call(url, method, data=self.codec.dumps(body), verify=False,headers=headers, retry=retry)
 
         # Format Error message for bad request
         except exceptions.BadRequest as error:
-            return {"error": json.loads(error.content)}
+            return {"error": self.codec.loads(error.content)}
 
-        # Handle Expired token
+        # Handle a token revoked before its expiry: refresh once and retry
         except exceptions.UnauthorizedAccess as error:
-            if self.token and self.username and self.password:
-                self.token = None
-                return self.request(url, method, body, headers)
+            if retry_auth and self.username and self.password:
+                self.invalidate_token(headers.get("X-Auth-Token"))
+                headers = util.merge_dict(headers, {"X-Auth-Token": self.get_token()["Token"]})
+                return self.request(url, method, body, headers, retry_auth=False, retry=retry)
             else:
                 raise error
 
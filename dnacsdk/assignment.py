@@ -0,0 +1,222 @@
+"""Sample usage
+from dnacsdk.api import Api
+from dnacsdk.assignment import BulkAssignment
+from dnacsdk import util
+
+dnacp = Api(ip=DNAC_IP, username=DNAC_USERNAME, password=DNAC_PASSWORD,
+            rate_limit=True)
+
+# Rows: {"profile": "Guest", "site": "Global/SJC/Bldg23"}
+#       {"device": "switch1", "site": "Global/SJC/Bldg23", "action": "unassign"}
+assigner = BulkAssignment(dnacp, max_workers = 8)
+results = assigner.run(util.load_rows("mapping.csv"))
+for result in results:
+    print(result.member, result.site, result.status, result.detail)
+
+# Rerun only what did not go through
+util.save_rows("retry.csv", BulkAssignment.failed_rows(results))
+"""
+from collections import namedtuple, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from .networkDevice import NetworkDevice, DeviceIndex
+from .profile import Profile
+from .site import Site
+from .task import Task
+
+
+# Outcome of one mapping row. status is "submitted", "skipped", "duplicate"
+# or "error"; row is the row as read, so failures can be written back out.
+AssignmentResult = namedtuple("AssignmentResult",
+    "kind member site action status detail task row")
+
+
+class BulkAssignment(object):
+    """Assigns many profiles and devices to sites.
+
+    Each row names either a profile (name or id) or a device (hostname,
+    management IP or id), a site (name, hierarchy or id) and optionally an
+    action, assign (default) or unassign. Rows are resolved against one
+    listing of sites, profiles and devices, duplicates are dropped and the
+    pairs are compared with the current site membership so that only the
+    changes actually needed are sent. Those are sent by at most max_workers
+    threads; the Api's rate limiter, when enabled, paces them further.
+
+    Because the membership is read again on every run, running a mapping
+    file a second time only sends the pairs that did not go through.
+    """
+
+    max_workers = 8
+
+    def __init__(self, dnacp, max_workers = None):
+        self.dnacp = dnacp
+        self.max_workers = max_workers or self.max_workers
+        self.sites = None
+        self.profiles = None
+        self.devices = None
+        self.device_members = {}
+
+    def load_sites(self):
+        self.sites = Site.index(Site.get_all(self.dnacp))
+        return self.sites
+
+    def load_profiles(self):
+        self.profiles = {}
+        profiles = Profile.get_all(self.dnacp)
+        for profile in profiles:
+            for key in (profile.id, profile.name):
+                self.profiles[key] = profile \
+                    if self.profiles.get(key, profile) is profile else None
+        return self.profiles
+
+    def resolve(self, row):
+        """Return (kind, member, site) for a row; raises ValueError
+        """
+        if self.sites is None:
+            self.load_sites()
+        site = self.sites.get(row.get("site"))
+        if site is None:
+            raise ValueError("unknown or ambiguous site: {}".format(row.get("site")))
+
+        if row.get("profile"):
+            if self.profiles is None:
+                self.load_profiles()
+            profile = self.profiles.get(row["profile"])
+            if profile is None:
+                raise ValueError("unknown or ambiguous profile: {}".format(row["profile"]))
+            return "profile", profile, site
+
+        if row.get("device"):
+            if self.devices is None:
+                self.devices = DeviceIndex.shared(self.dnacp).load()
+            device = None
+            for key in ("id", "hostname", "managementIpAddress"):
+                device = self.devices.cached(key, row["device"])
+                if device is not None:
+                    break
+            if device is None:
+                raise ValueError("no such device: {}".format(row["device"]))
+            return "device", device, site
+
+        raise ValueError("row needs a profile or a device")
+
+    def fetch_device_members(self, siteId):
+        members = self.dnacp.get("/api/v1/group/" + siteId + \
+        "/member?memberType=networkdevice")
+        members = set(member["id"] for member in members["response"])
+        self.device_members[siteId] = members
+        return members
+
+    def assigned(self, kind, member, site):
+        if kind == "profile":
+            return site.id in set(ref.uuid for ref in member.sites)
+        return member.id in self.device_members[site.id]
+
+    def plan(self, rows):
+        """Resolve and diff the rows without changing anything.
+
+        Returns one AssignmentResult per row, in row order; the ones still
+        to be sent have status "pending".
+        """
+        results = []
+        seen = OrderedDict()
+        for row in rows:
+            action = (row.get("action") or "assign").strip().lower()
+            name = row.get("profile") or row.get("device")
+            if action not in ("assign", "unassign"):
+                results.append(AssignmentResult(None, name, row.get("site"), action,
+                    "error", "unknown action", None, row))
+                continue
+            try:
+                kind, member, site = self.resolve(row)
+            except ValueError as e:
+                results.append(AssignmentResult(None, name, row.get("site"), action,
+                    "error", str(e), None, row))
+                continue
+
+            pair = (kind, member.id, site.id)
+            if pair in seen:
+                status, detail = "duplicate", "repeats an earlier row"
+                if seen[pair] != action:
+                    status, detail = "error", "both assigned and unassigned"
+                results.append(AssignmentResult(kind, member, site, action,
+                    status, detail, None, row))
+                continue
+            seen[pair] = action
+            results.append(AssignmentResult(kind, member, site, action,
+                "pending", None, None, row))
+
+        self.fetch_membership([result for result in results
+            if result.status == "pending"])
+
+        for position, result in enumerate(results):
+            if result.status != "pending":
+                continue
+            assigned = self.assigned(result.kind, result.member, result.site)
+            if result.action == "assign" and assigned:
+                results[position] = result._replace(status = "skipped",
+                    detail = "already assigned")
+            elif result.action == "unassign" and not assigned:
+                results[position] = result._replace(status = "skipped",
+                    detail = "not assigned")
+        return results
+
+    def fetch_membership(self, pending):
+        """Read the site membership of the profiles and sites involved,
+        concurrently
+        """
+        profiles = OrderedDict((result.member.id, result.member) for result in pending
+            if result.kind == "profile")
+        siteIds = set(result.site.id for result in pending if result.kind == "device")
+        siteIds -= set(self.device_members)
+
+        Profile.prefetch_sites(self.dnacp, list(profiles.values()),
+            max_workers = self.max_workers)
+        if siteIds:
+            with ThreadPoolExecutor(max_workers = self.max_workers) as pool:
+                list(pool.map(self.fetch_device_members, siteIds))
+
+    def apply(self, result):
+        params = {"siteid": result.site.id}
+        if result.kind == "profile":
+            params["profileid"] = result.member.id
+            handler = Profile
+        else:
+            params["deviceid"] = result.member.id
+            handler = NetworkDevice
+        if result.action == "assign":
+            return handler.assign(self.dnacp, params)
+        return handler.unassign(self.dnacp, params)
+
+    def run(self, rows, dry_run = False):
+        """Plan the rows and send the needed changes. Returns one
+        AssignmentResult per row, in row order.
+        """
+        results = self.plan(rows)
+        if dry_run:
+            return results
+
+        pending = [position for position, result in enumerate(results)
+            if result.status == "pending"]
+        with ThreadPoolExecutor(max_workers = self.max_workers) as pool:
+            outcomes = pool.map(lambda position: self.apply(results[position]), pending)
+            for position, outcome in zip(pending, outcomes):
+                if isinstance(outcome, Task):
+                    results[position] = results[position]._replace(
+                        status = "submitted", task = outcome)
+                elif isinstance(outcome, dict) and "error" not in outcome:
+                    results[position] = results[position]._replace(
+                        status = "submitted")
+                else:
+                    detail = outcome.get("error") if isinstance(outcome, dict) else outcome
+                    results[position] = results[position]._replace(
+                        status = "error", detail = str(detail))
+        return results
+
+    @classmethod
+    def failed_rows(cls, results):
+        """Rows whose change was not made, to be run again
+        """
+        return [result.row for result in results
+            if result.status == "error" or \
+            (result.task is not None and result.task.failed)]
@@ -0,0 +1,161 @@
+"""Sample usage
+from dnacsdk.api import Api
+from dnacsdk.cache import ResponseCache
+
+cache = ResponseCache(ttls={"/api/v1/network-device": 120}, max_entries=512)
+dnacp = Api(ip=DNAC_IP, username=DNAC_USERNAME, password=DNAC_PASSWORD,
+            cache=cache)
+
+sites = dnacp.get("/api/v1/group/?groupType=SITE")   # miss, one request
+sites = dnacp.get("/api/v1/group/?groupType=SITE")   # hit, no request
+fresh = dnacp.get("/api/v1/group/?groupType=SITE", bypass_cache=True)
+
+print(cache.stats())
+
+# Writes evict the cached reads they affect, so this lists the new WLAN
+Wlan.create(dnacp, create_params)
+wlans = Wlan.get_all(dnacp)
+"""
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+
+
+class ResponseCache(object):
+    """LRU cache of parsed GET responses with per-endpoint TTLs.
+
+    The TTL of an action is the one of its longest matching prefix in ttls;
+    actions without a match use ttl. A TTL of 0 disables caching, which is
+    the default for endpoints that are not listed. The cache is bounded by
+    both entry count and approximate size in bytes (the JSON length of the
+    response). Cached responses are shared, callers must not modify them.
+
+    Api evicts entries after every write through invalidate_for(), using
+    the invalidations map from written endpoints to the reads they affect.
+    """
+
+    default_ttls = {
+        "/api/v1/group": 300,
+        "/api/v1/siteprofile": 60,
+        "/api/v1/commonsetting": 60,
+        "/api/v1/template-programmer/template": 300,
+        "/api/v1/template-programmer/template/deploy": 0,
+        "/api/v1/task": 0,
+    }
+
+    # Writes and the cached reads they make stale: (methods, pattern matched
+    # against the written action, read prefixes to evict).
+    default_invalidations = [
+        # Wlan.create / Wlan.delete
+        (("POST", "PUT", "DELETE"), r"^/api/v1/commonsetting/wlan/",
+         ["/api/v1/commonsetting/wlan/"]),
+        # Wireless_VLAN.create / Wireless_VLAN.delete
+        (("POST", "PUT", "DELETE"), r"^/api/v1/commonsetting/global/",
+         ["/api/v1/commonsetting/global/"]),
+        # Profile.create / delete / assign / unassign
+        (("POST", "PUT", "DELETE"), r"^/api/v1/siteprofile",
+         ["/api/v1/siteprofile"]),
+        # NetworkDevice.assign / NetworkDevice.unassign
+        (("POST", "PUT", "DELETE"), r"^/api/v1/group/[^/]+/member",
+         ["/api/v1/group", "/api/v1/member", "/api/v1/network-device"]),
+        # Template and project create / update / version commit / delete;
+        # deploying a template changes no template-programmer reads
+        (("POST", "PUT", "DELETE"), r"^/api/v1/template-programmer/(project|template(?!/deploy))",
+         ["/api/v1/template-programmer/"]),
+    ]
+
+    def __init__(self, ttl=0, ttls=None, max_entries=1024, max_bytes=64 * 1024 * 1024,
+                 sizeof=None, invalidations=None):
+        self.ttl = ttl
+        self.ttls = dict(self.default_ttls)
+        self.ttls.update(ttls or {})
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof or (lambda value: len(json.dumps(value)))
+        self.invalidations = [(methods, re.compile(pattern), prefixes) for methods, pattern, prefixes
+                              in list(self.default_invalidations) + list(invalidations or [])]
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def ttl_for(self, action):
+        """Return the TTL in seconds that applies to action
+        """
+        match = None
+        for prefix in self.ttls:
+            if action.startswith(prefix) and (match is None or len(prefix) > len(match)):
+                match = prefix
+        return self.ttl if match is None else self.ttls[match]
+
+    def get(self, action):
+        """Return (True, response) on a hit and (False, None) on a miss
+        """
+        with self.lock:
+            entry = self.entries.get(action)
+            if entry is not None and entry[0] > time.monotonic():
+                self.entries.move_to_end(action)
+                self.hits += 1
+                return True, entry[1]
+            if entry is not None:
+                self._remove(action)
+            self.misses += 1
+            return False, None
+
+    def set(self, action, response):
+        """Store response for action if its endpoint is cacheable
+        """
+        ttl = self.ttl_for(action)
+        if not ttl:
+            return
+        size = self.sizeof(response)
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            if action in self.entries:
+                self._remove(action)
+            self.entries[action] = (time.monotonic() + ttl, response, size)
+            self.bytes += size
+            while len(self.entries) > self.max_entries or self.bytes > self.max_bytes:
+                self._remove(next(iter(self.entries)))
+                self.evictions += 1
+
+    def invalidate(self, prefix=None):
+        """Evict every entry whose action starts with prefix (all if None).
+        Returns the number of evicted entries.
+        """
+        with self.lock:
+            actions = [action for action in self.entries
+                       if prefix is None or action.startswith(prefix)]
+            for action in actions:
+                self._remove(action)
+            return len(actions)
+
+    def invalidate_for(self, method, action):
+        """Evict the cached reads that a method write to action affects.
+        Returns the number of evicted entries.
+        """
+        evicted = 0
+        for methods, pattern, prefixes in self.invalidations:
+            if method in methods and pattern.match(action):
+                for prefix in prefixes:
+                    evicted += self.invalidate(prefix)
+        return evicted
+
+    def stats(self):
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self.entries),
+                "bytes": self.bytes,
+            }
+
+    def _remove(self, action):
+        entry = self.entries.pop(action)
+        self.bytes -= entry[2]
@@ -0,0 +1,74 @@
+"""Sample usage
+from dnacsdk.api import Api
+from dnacsdk.codec import JsonCodec
+
+# orjson is used automatically when it is installed
+dnacp = Api(ip=DNAC_IP, username=DNAC_USERNAME, password=DNAC_PASSWORD)
+print(dnacp.codec.name)
+
+# Force the standard library
+dnacp = Api(ip=DNAC_IP, username=DNAC_USERNAME, password=DNAC_PASSWORD,
+            codec="json")
+"""
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class JsonCodec(object):
+    """Encodes request bodies to and decodes response bodies from UTF-8
+    bytes with the standard library json module
+    """
+
+    name = "json"
+
+    def dumps(self, value):
+        return json.dumps(value).encode("utf-8")
+
+    def loads(self, data):
+        # json.loads detects the encoding of bytes itself
+        return json.loads(data)
+
+
+class OrjsonCodec(JsonCodec):
+    """JsonCodec backed by the optional orjson package, which reads and
+    writes bytes directly. Values orjson cannot encode (e.g. tuple
+    subclasses) fall back to the standard library.
+    """
+
+    name = "orjson"
+
+    def __init__(self):
+        if orjson is None:
+            raise ImportError("OrjsonCodec requires the orjson package")
+
+    def dumps(self, value):
+        try:
+            return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            return super(OrjsonCodec, self).dumps(value)
+
+    def loads(self, data):
+        return orjson.loads(data)
+
+
+codecs = {
+    "json": JsonCodec,
+    "orjson": OrjsonCodec,
+}
+
+
+def get_codec(codec=None):
+    """Return a codec: the given codec object, one named in ``codecs``, or
+    for None the fastest one installed
+    """
+    if codec is None:
+        return OrjsonCodec() if orjson is not None else JsonCodec()
+    if isinstance(codec, str):
+        if codec not in codecs:
+            raise ValueError("Unknown codec: {}".format(codec))
+        return codecs[codec]()
+    return codec
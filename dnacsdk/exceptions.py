@@ -33,6 +33,18 @@ class MissingConfig(Exception):
     pass
 
 
+class ConcurrentModification(Exception):
+    """Controller state changed between a read and the write based on it
+    """
+    pass
+
+
+class TaskFailed(Exception):
+    """Controller task ended with an error or did not finish in time
+    """
+    pass
+
+
 class ClientError(ConnectionError):
     """4xx Client Error
     """
@@ -81,6 +93,13 @@ class ResourceInvalid(ClientError):
     pass
 
 
+class TooManyRequests(ClientError):
+    """429 Too Many Requests
+    """
+    def retry_after(self):
+        return self.response.headers.get('Retry-After')
+
+
 class ServerError(ConnectionError):
     """5xx Server Error
     """
@@ -1,45 +1,163 @@
 """Sample usage
 from dnacsdk.api import Api
-from dnacsdk.networkDevice import NetworkDevice
+from dnacsdk.networkDevice import NetworkDevice, DeviceIndex
 
 dnacp = Api(ip=DNAC_IP, username=DNAC_USERNAME, password=DNAC_PASSWORD)
 
 devices = NetworkDevice.get_all(dnacp)
 
+# Stream devices one page at a time
+for device in NetworkDevice.iter_all(dnacp, page_size = 100):
+    print(device.hostname)
+
+# Hostname, IP, serial and MAC lookups share one index per Api
+device = NetworkDevice(dnacp, hostname = "switch1")
+device = DeviceIndex.shared(dnacp).find("macAddress", "00:11:22:33:44:55")
+
+# Interfaces are cached per device; fetch a whole fleet in parallel
+interfaces, failures = NetworkDevice.get_interfaces_bulk(dnacp, devices, max_workers = 16)
+
+# Re-fetch every device individually (one extra request per device)
+devices = NetworkDevice.get_all(dnacp, hydrate = True)
 
 """
 
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from . import util
 from .exceptions import ResourceNotFound
+from .task import Task
 
 class NetworkDevice(object):
+    page_size = 500
+    interfaces_ttl = 300
+    interface_workers = 8
+
+    @classmethod
+    def get_all(cls, dnacp, hydrate = False):
+        """Return all network devices built from the list payload.
+
+        With hydrate=True every device is fetched again individually.
+        """
+        return list(cls.iter_all(dnacp, hydrate = hydrate))
+
+    @classmethod
+    def iter_all(cls, dnacp, page_size = None, hydrate = False):
+        """Yield network devices page by page.
+
+        Walks the controller's offset/limit paging (offset is 1-based). Each
+        page is streamed and its devices are yielded as they are decoded, so
+        at most one device of the response is held in memory at a time. The
+        controller may return fewer than page_size devices per page, so the
+        offset advances by what was received and only an empty page ends the
+        listing.
+
+        With hydrate=True only the ids of a page are read off the stream;
+        the devices are fetched once the page's response is closed, so the
+        extra requests never wait for the connection the stream holds.
+        """
+        util.require_sync(dnacp, "NetworkDevice.iter_all", "NetworkDevice.iter_all_async")
+        page_size = page_size or cls.page_size
+        offset = 1
+        while True:
+            count = 0
+            deviceIds = []
+            for device in dnacp.get_stream(cls.page_api(offset, page_size)):
+                count += 1
+                if hydrate:
+                    deviceIds.append(device["id"])
+                else:
+                    yield NetworkDevice(dnacp, device = device)
+            for deviceId in deviceIds:
+                yield NetworkDevice(dnacp, deviceId = deviceId, refresh = True)
+            if count == 0:
+                break
+            offset += count
+
+    @classmethod
+    def page_api(cls, offset, page_size):
+        return "/api/v1/network-device?offset={}&limit={}".format(offset, page_size)
+
+    @classmethod
+    async def iter_all_async(cls, dnacp, page_size = None):
+        """iter_all for an AsyncApi, as an async generator. Devices are
+        built from the list payload.
+        """
+        page_size = page_size or cls.page_size
+        offset = 1
+        while True:
+            count = 0
+            async for device in dnacp.get_stream(cls.page_api(offset, page_size)):
+                count += 1
+                yield NetworkDevice(dnacp, device = device)
+            if count == 0:
+                break
+            offset += count
+
     @classmethod
-    def get_all(cls, dnacp):
-        devices = dnacp.get("/api/v1/network-device")["response"]
-        devices = [NetworkDevice(dnacp, deviceId = device["id"]) for device in devices]
-        return devices
+    async def get_all_async(cls, dnacp, page_size = None):
+        """get_all for an AsyncApi
+        """
+        page_size = page_size or cls.page_size
+        offset = 1
+        all_devices = []
+        while True:
+            devices = (await dnacp.get(cls.page_api(offset, page_size)))["response"]
+            all_devices.extend(NetworkDevice(dnacp, device = device) for device in devices)
+            if not devices:
+                return all_devices
+            offset += len(devices)
 
     def __init__(self, dnacp,
         deviceId = None,
         managementIpAddress = None,
         hostname = None,
-        serialNumber = None):
+        serialNumber = None,
+        device = None,
+        refresh = False):
+        """Build a device from a list payload (device) or look it up by id,
+        serial number, management IP or hostname. Lookups are served from
+        the shared DeviceIndex when it holds the device; refresh=True always
+        reads the device from the controller and uses the index only to
+        resolve a hostname to its id.
+        """
+        index = None if device is not None else DeviceIndex.shared(dnacp)
+
+        if refresh and hostname is not None and deviceId is None:
+            found = index.find("hostname", hostname)
+            if found is None:
+                raise ResourceNotFound(None,
+                    "No network device with hostname {}".format(hostname))
+            deviceId = found.id
 
-        if not deviceId is None:
+        if not device is None:
+            api = None
+        elif not deviceId is None:
             api = "/api/v1/network-device/{}".format(deviceId)
-            # device = dnacp.get(api)["response"]
+            device = index.cached("id", deviceId)
         elif not serialNumber is None:
             api = "/api/v1/network-device/serial-number/{}".format(serialNumber)
-            # device = dnacp.get(api)["response"]
+            device = index.cached("serialNumber", serialNumber)
         elif not managementIpAddress is None:
             api = "/api/v1/network-device/ip-address/{}".format(managementIpAddress)
+            device = index.cached("managementIpAddress", managementIpAddress)
         elif not hostname is None:
-            all_devices = NetworkDevice.get_all(dnacp)
-            for device in all_devices:
-                if hostname == device.hostname:
-                    api = "/api/v1/network-device/{}".format(device.id)
-                    break
+            device = index.find("hostname", hostname)
+            if device is None:
+                raise ResourceNotFound(None,
+                    "No network device with hostname {}".format(hostname))
 
-        device = dnacp.get(api)["response"]
+        if refresh:
+            device = None
+        if isinstance(device, NetworkDevice):
+            device = device.info
+        elif device is None:
+            device = dnacp.get(api)["response"]
+            if index is not None:
+                index.add(NetworkDevice(dnacp, device = device))
 
         self.id = device["id"]
         self.hostname = device["hostname"]
@@ -54,17 +172,8 @@ class NetworkDevice(object):
 
         self.dnacp = dnacp
 
-        # self.interfaces = {}
-        #
-        # try:
-        #     interfaces_api = "/api/v1/interface/network-device/{}".format(self.id)
-        #     interfaces = dnacp.get(interfaces_api)["response"]
-        #     for interface in interfaces:
-        #         self.interfaces[interface["portName"]] = interface
-        # except ResourceNotFound:
-        #     pass
-        # except:
-        #     pass
+        self._interfaces = None
+        self._interfaces_at = None
 
 
     @classmethod
@@ -72,14 +181,14 @@ class NetworkDevice(object):
         try:
             body={"networkdevice":[assign_params["deviceid"]]}
             assignment= \
-            dnacp.post("/api/v1/group" + assign_params["siteid"] + \
+            dnacp.post("/api/v1/group/" + assign_params["siteid"] + \
             "/member", body)
         except Exception as e:
             assignment = e
             print(e)
 
 
-        return assignment
+        return Task.from_response(dnacp, assignment)
 
     @classmethod
     def unassign(self, dnacp, unassign_params = None):
@@ -92,21 +201,264 @@ class NetworkDevice(object):
             print(e)
 
 
-        return unassignment
+        return Task.from_response(dnacp, unassignment)
 
-    @property
-    def interfaces(self):
+    @classmethod
+    async def assign_async(cls, dnacp, assign_params = None):
+        try:
+            body={"networkdevice":[assign_params["deviceid"]]}
+            assignment= \
+            await dnacp.post("/api/v1/group/" + assign_params["siteid"] + \
+            "/member", body)
+        except Exception as e:
+            assignment = e
+            print(e)
+
+        return Task.from_response(dnacp, assignment)
+
+    @classmethod
+    async def unassign_async(cls, dnacp, unassign_params = None):
+        try:
+            unassignment= \
+            await dnacp.delete("/api/v1/group/" + unassign_params["siteid"] + \
+            "/member/" + unassign_params["deviceid"])
+        except Exception as e:
+            unassignment = e
+            print(e)
+
+        return Task.from_response(dnacp, unassignment)
+
+    @classmethod
+    def fetch_interfaces(cls, dnacp, deviceId):
+        """Read the interfaces of one device, keyed by port name.
+
+        A device without interfaces (404) yields an empty dict; any other
+        error is raised.
+        """
         interfaces_property = {}
 
         try:
-            interfaces_api = "/api/v1/interface/network-device/{}".format(self.id)
-            interfaces = self.dnacp.get(interfaces_api)["response"]
+            interfaces_api = "/api/v1/interface/network-device/{}".format(deviceId)
+            interfaces = dnacp.get(interfaces_api)["response"]
             for interface in interfaces:
                 interfaces_property[interface["portName"]] = interface
         except ResourceNotFound:
-            print("No Interfaces")
-            pass
-        except:
             pass
 
         return interfaces_property
+
+    def get_interfaces(self, refresh = False):
+        """Return this device's interfaces, re-reading them when the cached
+        copy is older than interfaces_ttl seconds or refresh is set.
+        """
+        expired = self._interfaces_at is None or \
+            time.monotonic() - self._interfaces_at > self.interfaces_ttl
+        if refresh or expired:
+            self.set_interfaces(NetworkDevice.fetch_interfaces(self.dnacp, self.id))
+        return self._interfaces
+
+    def set_interfaces(self, interfaces):
+        self._interfaces = interfaces
+        self._interfaces_at = time.monotonic()
+
+    def invalidate_interfaces(self):
+        """Drop the cached interfaces so the next access re-reads them
+        """
+        self._interfaces = None
+        self._interfaces_at = None
+
+    @property
+    def interfaces(self):
+        return self.get_interfaces()
+
+    @classmethod
+    def iter_interfaces(cls, dnacp, deviceId):
+        """Yield the interfaces of one device while the response is
+        streamed, bypassing the interface cache. A device without
+        interfaces (404) yields nothing.
+        """
+        interfaces_api = "/api/v1/interface/network-device/{}".format(deviceId)
+        try:
+            for interface in dnacp.get_stream(interfaces_api):
+                yield interface
+        except ResourceNotFound:
+            return
+
+    @classmethod
+    def get_interfaces_bulk(cls, dnacp, devices, max_workers = None, refresh = False):
+        """Fetch interfaces for many devices over a bounded worker pool.
+
+        devices may hold NetworkDevice objects (whose caches are used and
+        filled) or device ids. Returns two dicts keyed by device id: the
+        interfaces of every device that was fetched, and the exception of
+        every device that failed, so one failing device does not lose the
+        rest of the fleet.
+        """
+        def fetch(device):
+            try:
+                if isinstance(device, NetworkDevice):
+                    return device.id, device.get_interfaces(refresh = refresh), None
+                return device, NetworkDevice.fetch_interfaces(dnacp, device), None
+            except Exception as e:
+                deviceId = device.id if isinstance(device, NetworkDevice) else device
+                return deviceId, None, e
+
+        interfaces = dict()
+        failures = dict()
+        with ThreadPoolExecutor(max_workers = max_workers or cls.interface_workers) as pool:
+            for deviceId, device_interfaces, error in pool.map(fetch, devices):
+                if error is None:
+                    interfaces[deviceId] = device_interfaces
+                else:
+                    failures[deviceId] = error
+        return interfaces, failures
+
+
+class DeviceIndex(object):
+    """In-memory index of network devices keyed by id, hostname, management
+    IP, serial number and MAC address.
+
+    The index is warmed with one bulk listing (NetworkDevice.iter_all). After
+    that lookups are dictionary hits; a miss asks the controller for just the
+    missing device and adds it, so the index is refreshed incrementally
+    instead of being rebuilt. Each Api has its own index, returned by
+    DeviceIndex.shared().
+
+    Entries older than ttl seconds are not served, and any write to
+    network-device or group membership through the same Api clears the
+    index, so it never outlives the controller state it was read from.
+    """
+
+    keys = ("id", "hostname", "managementIpAddress", "serialNumber", "macAddress")
+    ttl = 300
+    invalidated_by = re.compile(r"^/?api/v1/(network-device|group/[^/]+/member)")
+
+    _shared_lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, dnacp):
+        """Return the index belonging to dnacp. It is kept on the Api object
+        itself, so it goes away with it and is never shared between two Api
+        objects for the same controller.
+        """
+        with cls._shared_lock:
+            index = getattr(dnacp, "_device_index", None)
+            if index is None:
+                index = dnacp._device_index = cls(dnacp)
+        return index
+
+    def __init__(self, dnacp):
+        self.dnacp = dnacp
+        self.devices = {}
+        self.added = {}
+        self.lookup = dict((key, {}) for key in self.keys)
+        self.loaded = False
+        self.loaded_at = None
+        self.lock = threading.RLock()
+        if hasattr(dnacp, "add_write_listener"):
+            dnacp.add_write_listener(self.on_write)
+
+    def on_write(self, method, action):
+        if self.invalidated_by.match(action):
+            self.clear()
+
+    def clear(self):
+        """Forget every device; the next find() reloads the listing
+        """
+        with self.lock:
+            self.devices = {}
+            self.added = {}
+            self.lookup = dict((key, {}) for key in self.keys)
+            self.loaded = False
+            self.loaded_at = None
+
+    def expired(self, deviceId):
+        added = self.added.get(deviceId)
+        return added is None or time.monotonic() - added > self.ttl
+
+    @staticmethod
+    def normalize(value):
+        return str(value).strip().lower()
+
+    def load(self, page_size = None):
+        """(Re)build the index from one bulk listing
+        """
+        seen = set()
+        for device in NetworkDevice.iter_all(self.dnacp, page_size = page_size):
+            self.add(device)
+            seen.add(device.id)
+        with self.lock:
+            for deviceId in set(self.devices) - seen:
+                self.discard(deviceId)
+            self.loaded = True
+            self.loaded_at = time.monotonic()
+        return self
+
+    def add(self, device):
+        """Index a NetworkDevice, replacing any previous entry with its id
+        """
+        with self.lock:
+            self.discard(device.id)
+            self.devices[device.id] = device
+            self.added[device.id] = time.monotonic()
+            for key in self.keys:
+                value = getattr(device, key, None)
+                if value:
+                    self.lookup[key][self.normalize(value)] = device
+        return device
+
+    def discard(self, deviceId):
+        """Drop a device from the index
+        """
+        with self.lock:
+            device = self.devices.pop(deviceId, None)
+            self.added.pop(deviceId, None)
+            if device is None:
+                return
+            for key in self.keys:
+                value = getattr(device, key, None)
+                if value and self.lookup[key].get(self.normalize(value)) is device:
+                    del self.lookup[key][self.normalize(value)]
+
+    def cached(self, key, value):
+        """Return the indexed device for key/value without any request, or
+        None when it is not indexed or older than ttl
+        """
+        with self.lock:
+            device = self.lookup[key].get(self.normalize(value))
+            if device is None or self.expired(device.id):
+                return None
+            return device
+
+    def find(self, key, value):
+        """Return the device for key/value, or None if the controller has none.
+
+        Warms the index on first use. A miss fetches only the matching device.
+        """
+        stale = lambda: not self.loaded or \
+            time.monotonic() - self.loaded_at > self.ttl
+        if stale():
+            with self.lock:
+                if stale():
+                    self.load()
+
+        device = self.cached(key, value)
+        if device is not None:
+            return device
+
+        if key == "id":
+            api = "/api/v1/network-device/{}".format(value)
+        else:
+            api = util.join_url_params("/api/v1/network-device", {key: value})
+        try:
+            found = self.dnacp.get(api)["response"]
+        except ResourceNotFound:
+            return None
+        if isinstance(found, dict):
+            found = [found]
+        for payload in found:
+            self.add(NetworkDevice(self.dnacp, device = payload))
+        return self.cached(key, value)
+
+    def __len__(self):
+        return len(self.devices)
@@ -0,0 +1,119 @@
+"""Sample usage
+from dnacsdk.poller import Poller
+
+poller = Poller(fetch = lambda taskId: dnacp.get("/api/v1/task/" + taskId),
+                is_final = lambda status: "endTime" in status["response"],
+                max_workers = 8, timeout = 300)
+
+for taskId, status in poller.poll(taskIds):
+    print(taskId, status)
+
+print("Still running:", poller.unfinished)
+"""
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from . import util
+from .exceptions import TaskFailed
+
+
+class Poller(object):
+    """Polls many ids concurrently until each one reaches a final state.
+
+    fetch(id) reads the current state of an id and is_final(state) tells
+    whether polling can stop. Each id is polled again after a delay that
+    starts at initial_delay and grows by backoff up to max_delay. At most
+    max_workers fetches run at once. A fetch that raises is retried with
+    the same backoff; after max_errors consecutive errors the id is given
+    up and its exception yielded as its state. A state that is an error
+    payload ({"error": ...}) is not retried and is yielded as a TaskFailed.
+    When timeout seconds have passed, polling stops without waiting for
+    fetches in flight, and the ids not yet final are left in unfinished.
+    """
+
+    def __init__(self, fetch, is_final, max_workers = 8, initial_delay = 1,
+        max_delay = 30, backoff = 2, timeout = 600, max_errors = 3):
+        self.fetch = fetch
+        self.is_final = is_final
+        self.max_workers = max_workers
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.backoff = backoff
+        self.timeout = timeout
+        self.max_errors = max_errors
+        self.unfinished = set()
+
+    def poll(self, ids):
+        """Yield (id, state) for every state read, until all ids are final
+        or the timeout expires
+        """
+        ids = list(dict.fromkeys(ids))
+        self.unfinished = set(ids)
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        due = dict((item, time.monotonic()) for item in ids)
+        delays = dict((item, self.initial_delay) for item in ids)
+        errors = dict((item, 0) for item in ids)
+        running = {}
+
+        pool = ThreadPoolExecutor(max_workers = self.max_workers)
+        try:
+            while due or running:
+                now = time.monotonic()
+                if deadline is not None and now >= deadline:
+                    break
+
+                for item, when in sorted(due.items(), key = lambda entry: entry[1]):
+                    if when > now or len(running) >= self.max_workers:
+                        break
+                    del due[item]
+                    running[pool.submit(self.fetch, item)] = item
+
+                wait_for = None
+                if due and len(running) < self.max_workers:
+                    wait_for = max(min(due.values()) - now, 0)
+                if deadline is not None:
+                    wait_for = util.min_timeout(wait_for, max(deadline - now, 0))
+                if running:
+                    done, _ = wait(list(running), timeout = wait_for,
+                        return_when = FIRST_COMPLETED)
+                else:
+                    time.sleep(wait_for or 0)
+                    done = ()
+
+                for future in done:
+                    item = running.pop(future)
+                    try:
+                        state = future.result()
+                    except Exception as error:
+                        errors[item] += 1
+                        logging.warning("Polling %s failed: %s" % (item, error))
+                        if errors[item] >= self.max_errors:
+                            self.unfinished.discard(item)
+                            yield item, error
+                        else:
+                            self.reschedule(item, due, delays)
+                        continue
+
+                    if isinstance(state, dict) and "error" in state:
+                        # The controller rejected the read, e.g. an unknown id
+                        self.unfinished.discard(item)
+                        yield item, TaskFailed(state["error"])
+                        continue
+
+                    errors[item] = 0
+                    yield item, state
+                    if self.is_final(state):
+                        self.unfinished.discard(item)
+                    else:
+                        self.reschedule(item, due, delays)
+        finally:
+            # Do not wait for fetches still in flight after a timeout (or
+            # when the caller stops iterating); their results are dropped
+            for future in running:
+                future.cancel()
+            pool.shutdown(wait = False)
+
+    def reschedule(self, item, due, delays):
+        due[item] = time.monotonic() + delays[item]
+        delays[item] = min(delays[item] * self.backoff, self.max_delay)
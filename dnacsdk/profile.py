@@ -5,18 +5,76 @@ from dnacsdk.profile import Profile
 dnacp = Api(ip=DNAC_IP, username=DNAC_USERNAME, password=DNAC_PASSWORD)
 
 profiles = Profile.get_all(dnacp)
+
+# Fetch site membership for every profile concurrently
+profiles = Profile.get_all(dnacp, prefetch_sites = True)
+for site in profiles[0].sites:
+    print(site.name, site.uuid)
 """
+import asyncio
 import sys
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from . import util
+from .task import Task
+
+SiteRef = namedtuple("SiteRef", ["name", "uuid"])
 
 class Profile(object):
 
+    prefetch_workers = 8
+
     @classmethod
-    def get_all(cls, dnacp):
+    def get_all(cls, dnacp, prefetch_sites = False, max_workers = None):
+        util.require_sync(dnacp, "Profile.get_all", "Profile.get_all_async")
         profiles = \
         dnacp.get("/api/v1/siteprofile")
         profiles = profiles["response"]
         profiles = [Profile(dnacp, profile = \
         profile) for profile in profiles]
+        if prefetch_sites:
+            cls.prefetch_sites(dnacp, profiles, max_workers = max_workers)
+        return profiles
+
+    @classmethod
+    def iter_all(cls, dnacp):
+        """Yield the profiles one at a time while the response is streamed
+        """
+        util.require_sync(dnacp, "Profile.iter_all", "Profile.get_all_async")
+        for profile in dnacp.get_stream("/api/v1/siteprofile"):
+            yield Profile(dnacp, profile = profile)
+
+    @classmethod
+    def prefetch_sites(cls, dnacp, profiles, max_workers = None):
+        """Fill site membership for many profiles over a bounded worker pool
+        """
+        pending = [profile for profile in profiles if profile._sites is None]
+        util.require_sync(dnacp, "Profile.prefetch_sites",
+            "Profile.get_all_async(dnacp, prefetch_sites = True)")
+        if not pending:
+            return profiles
+        with ThreadPoolExecutor(max_workers = max_workers or cls.prefetch_workers) as pool:
+            list(pool.map(lambda profile: profile.fetch_sites(), pending))
+        return profiles
+
+    @classmethod
+    async def get_all_async(cls, dnacp, prefetch_sites = False, max_workers = None):
+        """get_all for an AsyncApi. With prefetch_sites, site membership is
+        read for all profiles concurrently, at most max_workers at a time.
+        """
+        profiles = \
+        await dnacp.get("/api/v1/siteprofile")
+        profiles = [Profile(dnacp, profile = \
+        profile) for profile in profiles["response"]]
+        if prefetch_sites:
+            limit = asyncio.Semaphore(max_workers or cls.prefetch_workers)
+
+            async def fetch(profile):
+                async with limit:
+                    await profile.fetch_sites_async()
+
+            await asyncio.gather(*[fetch(profile) for profile in profiles])
         return profiles
 
     def __init__(self, dnacp, profile = None):
@@ -25,24 +83,46 @@ class Profile(object):
             self.name = self.info["name"]
             self.id = self.info["siteProfileUuid"]
             self.namespace = self.info["namespace"]
-            self.sites = ""
-            sites = dnacp.get("/api/v1/siteprofile/" + self.id + \
-            "?includeSites=true")
-            sites = sites["response"]
-            if "sites" in sites.keys():
-                sites = sites["sites"]
-                for site in sites:
-                    self.sites += "name: " + site["name"] + "\n" + \
-                    "siteid: " + site["uuid"] + "\n\n"
+            self.dnacp = dnacp
+            self._sites = None
 
         except Exception as e:
             print(e)
             print("Parameters invalid")
             sys.exit()
 
+    def fetch_sites(self):
+        """Read the sites assigned to this profile as a list of SiteRef
+        """
+        util.require_sync(self.dnacp, "Profile.fetch_sites",
+            "await profile.fetch_sites_async()")
+        sites = self.dnacp.get("/api/v1/siteprofile/" + self.id + \
+        "?includeSites=true")
+        return self.set_sites(sites)
+
+    async def fetch_sites_async(self):
+        sites = await self.dnacp.get("/api/v1/siteprofile/" + self.id + \
+        "?includeSites=true")
+        return self.set_sites(sites)
+
+    def set_sites(self, sites):
+        sites = sites["response"]
+        self._sites = [SiteRef(site["name"], site["uuid"]) \
+        for site in sites.get("sites", [])]
+        return self._sites
+
+    @property
+    def sites(self):
+        """Sites assigned to this profile, fetched on first access. With an
+        AsyncApi, await fetch_sites_async() (or prefetch) before reading it.
+        """
+        if self._sites is None:
+            self.fetch_sites()
+        return self._sites
+
     @classmethod
-    def create(self, dnacp, create_params = None):
-        body ={
+    def create_body(cls, create_params):
+        return {
             "attributesList":[],
             "groupTypeList":[],
             "id":"",
@@ -95,16 +175,31 @@ class Profile(object):
             "version":0
         }
 
+    @classmethod
+    def create(self, dnacp, create_params = None):
         creation=""
         try:
             creation = \
             dnacp.post("/api/v1/siteprofile", \
-            body)
+            self.create_body(create_params))
+        except Exception as e:
+            creation = e
+            print(e)
+
+        return Task.from_response(dnacp, creation)
+
+    @classmethod
+    async def create_async(cls, dnacp, create_params = None):
+        creation=""
+        try:
+            creation = \
+            await dnacp.post("/api/v1/siteprofile", \
+            cls.create_body(create_params))
         except Exception as e:
             creation = e
             print(e)
 
-        return creation
+        return Task.from_response(dnacp, creation)
 
     @classmethod
     def delete(self, dnacp, delete_params = None):
@@ -117,7 +212,18 @@ class Profile(object):
             print(e)
 
 
-        return deletion
+        return Task.from_response(dnacp, deletion)
+
+    @classmethod
+    async def delete_async(cls, dnacp, delete_params = None):
+        try:
+            deletion = \
+            await dnacp.delete("/api/v1/siteprofile/" + delete_params["id"])
+        except Exception as e:
+            deletion = e
+            print(e)
+
+        return Task.from_response(dnacp, deletion)
 
     @classmethod
     def assign(self, dnacp, assign_params = None):
@@ -130,7 +236,19 @@ class Profile(object):
             print(e)
 
 
-        return assignment
+        return Task.from_response(dnacp, assignment)
+
+    @classmethod
+    async def assign_async(cls, dnacp, assign_params = None):
+        try:
+            assignment= \
+            await dnacp.post("/api/v1/siteprofile/" + assign_params["profileid"] + \
+            "/site/" + assign_params["siteid"])
+        except Exception as e:
+            assignment = e
+            print(e)
+
+        return Task.from_response(dnacp, assignment)
 
     @classmethod
     def unassign(self, dnacp, unassign_params = None):
@@ -143,14 +261,20 @@ class Profile(object):
             print(e)
 
 
-        return unassignment
+        return Task.from_response(dnacp, unassignment)
 
     @classmethod
-    def task_status(cls, dnacp, taskId):
-        api = "/api/v1/task{}".format(
-            taskId
-        )
-        return dnacp.get(api)
+    async def unassign_async(cls, dnacp, unassign_params = None):
+        try:
+            unassignment= \
+            await dnacp.delete("/api/v1/siteprofile/" + unassign_params["profileid"] + \
+            "/site/" + unassign_params["siteid"])
+        except Exception as e:
+            unassignment = e
+            print(e)
 
+        return Task.from_response(dnacp, unassignment)
 
-        return creation
+    @classmethod
+    def task_status(cls, dnacp, taskId):
+        return dnacp.get(Task.api(taskId))
@@ -0,0 +1,218 @@
+"""Sample usage
+from dnacsdk.api import Api
+from dnacsdk.ratelimit import RateLimiter
+
+limiter = RateLimiter(rate=10, burst=20, rates={"template-programmer": (2, 4)})
+dnacp = Api(ip=DNAC_IP, username=DNAC_USERNAME, password=DNAC_PASSWORD,
+            rate_limit=limiter)
+
+print(limiter.stats())
+"""
+import asyncio
+import threading
+import time
+
+try:
+    from urllib.parse import urlparse
+except ImportError:
+    from urlparse import urlparse
+
+
+class TokenBucket(object):
+    """Allows ``rate`` calls per second on average and bursts of ``burst``
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        """Take one token and return the seconds to wait before using it
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0
+            return -self.tokens / self.rate
+
+
+class AimdWindow(object):
+    """Concurrency window with additive increase, multiplicative decrease.
+
+    At most ``limit`` calls are in flight. Every successful call grows the
+    limit by increase / limit (about ``increase`` per window of calls); a
+    congested call (429/503 or transport error) multiplies it by
+    ``decrease``. The limit stays within [minimum, maximum].
+
+    A burst of congested responses is one congestion event: the limit is
+    decreased at most once per window. acquire() returns a ticket for the
+    call; congestion reported by a call that started before the last
+    decrease is ignored, as that call was sent under the old limit.
+    """
+
+    def __init__(self, initial=8, minimum=1, maximum=64, increase=1.0, decrease=0.5):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.increase = increase
+        self.decrease = decrease
+        self.in_flight = 0
+        self.started = 0
+        self.decreased_at = 0
+        self.condition = threading.Condition()
+        # (loop, future) of coroutines waiting in acquire_async
+        self.waiters = []
+
+    def take(self):
+        """Take a slot if one is free; returns its ticket or None. Call
+        with the condition held.
+        """
+        if self.in_flight >= max(int(self.limit), self.minimum):
+            return None
+        self.in_flight += 1
+        self.started += 1
+        return self.started
+
+    def try_acquire(self):
+        with self.condition:
+            return self.take()
+
+    def acquire(self):
+        with self.condition:
+            ticket = self.take()
+            while ticket is None:
+                self.condition.wait()
+                ticket = self.take()
+            return ticket
+
+    async def acquire_async(self):
+        """acquire() for coroutines. Waits on a future that release()
+        resolves, without blocking the event loop.
+        """
+        loop = asyncio.get_event_loop()
+        while True:
+            with self.condition:
+                ticket = self.take()
+                if ticket is not None:
+                    return ticket
+                waiter = loop.create_future()
+                self.waiters.append((loop, waiter))
+            try:
+                await waiter
+            finally:
+                with self.condition:
+                    if (loop, waiter) in self.waiters:
+                        self.waiters.remove((loop, waiter))
+
+    def release(self, congested=False, ticket=None):
+        """Free a slot. congested=None frees it without adapting the limit.
+        ticket is the value acquire() returned; without it congestion
+        always decreases the limit.
+        """
+        with self.condition:
+            self.in_flight -= 1
+            if congested:
+                if ticket is None or ticket > self.decreased_at:
+                    self.limit = max(self.minimum, self.limit * self.decrease)
+                    self.decreased_at = self.started
+            elif congested is not None:
+                self.limit = min(self.maximum, self.limit + self.increase / self.limit)
+            self.condition.notify_all()
+            waiters, self.waiters = self.waiters, []
+        for loop, waiter in waiters:
+            loop.call_soon_threadsafe(self.wake, waiter)
+
+    @staticmethod
+    def wake(waiter):
+        if not waiter.done():
+            waiter.set_result(None)
+
+
+class RateLimiter(object):
+    """Client-side limiter combining a token bucket per endpoint family with
+    one shared AIMD concurrency window.
+
+    The family of a call is the path segment after the API version, e.g.
+    "network-device" for /api/v1/network-device/{id}. Families use
+    (rate, burst) from ``rates`` or the default ``rate`` and ``burst``.
+
+    A call holds its window slot until its response headers arrive. The
+    body of a streamed response (Api.get_stream) is read without a slot,
+    so calls made while iterating a stream never wait on the stream itself.
+    """
+
+    def __init__(self, rate=10, burst=20, rates=None, window=None):
+        self.rate = rate
+        self.burst = burst
+        self.rates = rates or {}
+        self.window = window or AimdWindow()
+        self.buckets = {}
+        self.lock = threading.Lock()
+        self.throttled = 0
+        self.congested = 0
+
+    @staticmethod
+    def family(url):
+        segments = [segment for segment in urlparse(url).path.split("/") if segment]
+        # /api/v1/<family>/... and /api/system/v1/<family>/...
+        for index, segment in enumerate(segments):
+            if segment.startswith("v") and segment[1:].isdigit():
+                return segments[index + 1] if index + 1 < len(segments) else segment
+        return segments[0] if segments else ""
+
+    def bucket(self, family):
+        with self.lock:
+            bucket = self.buckets.get(family)
+            if bucket is None:
+                rate, burst = self.rates.get(family, (self.rate, self.burst))
+                bucket = self.buckets[family] = TokenBucket(rate, burst)
+            return bucket
+
+    def acquire(self, url):
+        """Block until a call to url may start; returns the ticket to pass
+        to release()
+        """
+        wait = self.bucket(self.family(url)).reserve()
+        if wait > 0:
+            with self.lock:
+                self.throttled += 1
+            time.sleep(wait)
+        return self.window.acquire()
+
+    async def acquire_async(self, url):
+        """acquire() for coroutines; waits without blocking the event loop
+        """
+        wait = self.bucket(self.family(url)).reserve()
+        if wait > 0:
+            with self.lock:
+                self.throttled += 1
+            await asyncio.sleep(wait)
+        return await self.window.acquire_async()
+
+    def release(self, status=None, ticket=None):
+        """Report the end of a call. status None means a transport error.
+        """
+        congested = status is None or status in (429, 503)
+        if congested:
+            with self.lock:
+                self.congested += 1
+        self.window.release(congested, ticket)
+
+    def cancel(self):
+        """Free the slot of a call that failed for a reason unrelated to load
+        """
+        self.window.release(None)
+
+    def stats(self):
+        return {
+            "limit": self.window.limit,
+            "in_flight": self.window.in_flight,
+            "throttled": self.throttled,
+            "congested": self.congested,
+        }
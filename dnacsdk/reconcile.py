@@ -0,0 +1,379 @@
+"""Sample usage
+from dnacsdk.api import Api
+from dnacsdk.reconcile import Reconciler
+from dnacsdk import util
+
+dnacp = Api(ip=DNAC_IP, username=DNAC_USERNAME, password=DNAC_PASSWORD)
+
+# desired.yaml:
+#   wireless_vlans:
+#     - {vlanId: 87, interfaceName: guest}
+#     - {vlanId: 86, state: absent}
+#   wlans:
+#     - {ssid: guest, wlanType: Guest, authType: open}
+#   profiles:
+#     - {name: Guest, interfaceName: guest, vlanId: 87,
+#        sites: [Global/SJC/Bldg23, Global/SJC/Bldg24]}
+reconciler = Reconciler(dnacp)
+plan = reconciler.plan(util.load_document("desired.yaml"))
+for operation in plan:
+    print(operation)
+
+for result in reconciler.apply(plan):
+    print(result.operation, result.status, result.detail or "")
+"""
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from .profile import Profile
+from .site import Site
+from .task import Task, TaskTracker
+from .teardown import Teardown
+from .wireless_vlan import Wireless_VLAN
+from .wlan import Wlan
+
+
+# Operations run in phase order so that nothing is created before what it
+# depends on, or deleted before what depends on it
+PHASES = (
+    "create wireless vlans",
+    "create and update wlans",
+    "create profiles",
+    "assign and unassign sites",
+    "delete profiles",
+    "delete wlans",
+    "delete wireless vlans",
+)
+
+State = namedtuple("State", "wlans wireless_vlans profiles sites")
+
+ReconcileResult = namedtuple("ReconcileResult", "operation status detail")
+
+
+class Operation(namedtuple("Operation", "phase action kind name detail run")):
+    """One change of a plan. run() performs it and returns a Task, a list
+    of Tasks, or the response/exception of a failed call.
+    """
+    __slots__ = ()
+
+    def __str__(self):
+        return "{} {} {}{}".format(self.action, self.kind, self.name,
+            " ({})".format(self.detail) if self.detail else "")
+
+
+class Reconciler(object):
+    """Brings WLANs, wireless VLANs and profiles to a desired state.
+
+    The desired-state document has optional wlans, wireless_vlans and
+    profiles lists. Each entry is identified by its ssid, vlanId or name
+    and may set state: absent to have it removed. WLAN entries carry the
+    settings to enforce (see Wlan.setting); fields not given are left as
+    they are. Profiles need interfaceName and vlanId to be created, and
+    their sites list (names, hierarchies or ids), when given, is the exact
+    set of sites the profile should be assigned to. Objects not mentioned
+    in the document are not touched, and a wlan or wireless vlan cannot be
+    removed while a profile that stays refers to it.
+
+    plan() reads the current state once and returns only the operations
+    needed; for a compliant controller it is empty and nothing else is
+    sent. apply() runs the operations phase by phase (see PHASES), at most
+    max_workers at a time, and waits for their tasks before starting the
+    next phase. When an operation fails the later phases are not run.
+    """
+
+    max_workers = 8
+
+    def __init__(self, dnacp, max_workers = None, timeout = 600):
+        self.dnacp = dnacp
+        self.max_workers = max_workers or self.max_workers
+        self.timeout = timeout
+        self.profile_ids = {}
+        self.lock = threading.Lock()
+
+    def load_state(self):
+        """Read WLANs, wireless VLANs, profiles and sites concurrently
+        """
+        with ThreadPoolExecutor(max_workers = 4) as pool:
+            wlans = pool.submit(Wlan.get_all, self.dnacp)
+            wireless_vlans = pool.submit(Wireless_VLAN.get_all, self.dnacp)
+            profiles = pool.submit(Profile.get_all, self.dnacp)
+            sites = pool.submit(Site.get_all, self.dnacp)
+            return State(wlans.result(), wireless_vlans.result(),
+                profiles.result(), sites.result())
+
+    def plan(self, desired, state = None):
+        """Return the list of Operations that turns the current state into
+        desired, in phase order. Raises ValueError listing every problem
+        of the document.
+        """
+        state = state or self.load_state()
+        problems = []
+        operations = []
+
+        vlanIds = self.plan_wireless_vlans(desired, state, operations, problems)
+        self.plan_wlans(desired, state, operations, problems)
+        self.plan_profiles(desired, state, vlanIds, operations, problems)
+        self.check_references(desired, state, vlanIds, problems)
+
+        if problems:
+            raise ValueError("Desired state invalid:\n  " + "\n  ".join(problems))
+        return sorted(operations, key = lambda operation: operation.phase)
+
+    def plan_wireless_vlans(self, desired, state, operations, problems):
+        """Plan VLAN changes; returns the vlanIds that will exist afterwards
+        """
+        current = dict((str(wireless_vlan.vlanId), wireless_vlan) \
+        for wireless_vlan in state.wireless_vlans)
+        vlanIds = set(current)
+        creates, deletes = [], []
+
+        for item in desired.get("wireless_vlans") or []:
+            if "vlanId" not in item:
+                problems.append("wireless vlan without vlanId: {}".format(item))
+                continue
+            vlanId = str(item["vlanId"])
+            existing = current.get(vlanId)
+            if item.get("state") == "absent":
+                if existing is not None:
+                    deletes.append({"vlanId": existing.vlanId})
+                    vlanIds.discard(vlanId)
+            elif not item.get("interfaceName"):
+                problems.append("wireless vlan {} needs an interfaceName".format(vlanId))
+            elif existing is None:
+                creates.append({"vlanId": item["vlanId"],
+                    "interfaceName": item["interfaceName"]})
+                vlanIds.add(vlanId)
+            elif existing.interfaceName != item["interfaceName"]:
+                problems.append("wireless vlan {} exists with interfaceName {}; "
+                    "remove it first".format(vlanId, existing.interfaceName))
+
+        if creates:
+            operations.append(Operation(0, "create", "wireless vlan",
+                ", ".join(str(params["vlanId"]) for params in creates), None,
+                lambda: self.vlan_batch(creates = creates)))
+        if deletes:
+            operations.append(Operation(6, "delete", "wireless vlan",
+                ", ".join(str(params["vlanId"]) for params in deletes), None,
+                lambda: self.vlan_batch(deletes = deletes)))
+        return vlanIds
+
+    def plan_wlans(self, desired, state, operations, problems):
+        current = dict((wlan.ssid, wlan) for wlan in state.wlans)
+        creates, updates = [], []
+
+        for item in desired.get("wlans") or []:
+            ssid = item.get("ssid")
+            if not ssid:
+                problems.append("wlan without ssid: {}".format(item))
+                continue
+            existing = current.get(ssid)
+            if item.get("state") == "absent":
+                if existing is not None:
+                    operations.append(Operation(5, "delete", "wlan", ssid, None,
+                        lambda key = existing.key: Wlan.delete(self.dnacp, {"key": key})))
+                continue
+
+            settings = dict((field, value) for field, value in item.items() \
+            if field != "state")
+            try:
+                setting = Wlan.setting(settings)
+            except ValueError as e:
+                problems.append("wlan {}: {}".format(ssid, e))
+                continue
+            value = setting["value"][0]
+
+            if existing is None:
+                creates.append((ssid, setting))
+                continue
+
+            current_value = existing.info["value"][0]
+            changed = [field for field in settings \
+            if field != "ssid" and value[field] != current_value.get(field)]
+            if changed:
+                setting = dict(existing.info, value = [dict(current_value,
+                    **dict((field, value[field]) for field in changed))])
+                updates.append((ssid, setting, changed))
+
+        # All WLAN settings go out in one commonsetting POST per kind
+        if creates:
+            operations.append(Operation(1, "create", "wlan",
+                ", ".join(ssid for ssid, _ in creates), None,
+                lambda: self.post_wlans([setting for _, setting in creates])))
+        if updates:
+            operations.append(Operation(1, "update", "wlan",
+                ", ".join(ssid for ssid, _, _ in updates),
+                "; ".join("{}: {}".format(ssid, ", ".join(changed)) \
+                for ssid, _, changed in updates),
+                lambda: self.post_wlans([setting for _, setting, _ in updates])))
+
+    def plan_profiles(self, desired, state, vlanIds, operations, problems):
+        current = dict((profile.name, profile) for profile in state.profiles)
+        sites = Site.index(state.sites)
+        items = [item for item in desired.get("profiles") or [] if item.get("name")]
+        for item in desired.get("profiles") or []:
+            if not item.get("name"):
+                problems.append("profile without name: {}".format(item))
+
+        # Membership is only needed for profiles whose sites are managed
+        Profile.prefetch_sites(self.dnacp, [current[item["name"]] for item in items \
+            if item["name"] in current and \
+            ("sites" in item or item.get("state") == "absent")],
+            max_workers = self.max_workers)
+
+        for item in items:
+            name = item["name"]
+            existing = current.get(name)
+            if item.get("state") == "absent":
+                if existing is not None:
+                    for site in existing.sites:
+                        operations.append(self.site_operation("unassign", name,
+                            site.name, site.uuid))
+                    operations.append(Operation(4, "delete", "profile", name, None,
+                        lambda profileId = existing.id: Profile.delete(self.dnacp,
+                            {"id": profileId})))
+                continue
+
+            assigned = set()
+            if existing is None:
+                missing = [field for field in ("interfaceName", "vlanId") \
+                if field not in item]
+                if missing:
+                    problems.append("profile {} needs {}".format(name, " and ".join(missing)))
+                    continue
+                if str(item["vlanId"]) not in vlanIds:
+                    problems.append("profile {} uses wireless vlan {}, which will "
+                        "not exist".format(name, item["vlanId"]))
+                    continue
+                create_params = {"name": name, "interfaceName": item["interfaceName"],
+                    "vlanId": item["vlanId"]}
+                operations.append(Operation(2, "create", "profile", name, None,
+                    lambda create_params = create_params: Profile.create(self.dnacp,
+                        create_params)))
+            else:
+                assigned = dict((site.uuid, site.name) for site in existing.sites)
+
+            if "sites" not in item:
+                continue
+            wanted = {}
+            for key in item["sites"] or []:
+                site = sites.get(key)
+                if site is None:
+                    problems.append("profile {}: unknown or ambiguous site {}"
+                        .format(name, key))
+                else:
+                    wanted[site.id] = site.groupNameHierarchy
+            for siteId in wanted:
+                if siteId not in assigned:
+                    operations.append(self.site_operation("assign", name,
+                        wanted[siteId], siteId))
+            for siteId in assigned:
+                if siteId not in wanted:
+                    operations.append(self.site_operation("unassign", name,
+                        assigned[siteId], siteId))
+
+    def check_references(self, desired, state, vlanIds, problems):
+        """Reject deleting a wlan or wireless vlan that a profile the plan
+        keeps still refers to
+        """
+        deleted_vlans = set(str(wireless_vlan.vlanId) \
+        for wireless_vlan in state.wireless_vlans) - vlanIds
+        existing_ssids = set(wlan.ssid for wlan in state.wlans)
+        deleted_ssids = set(item.get("ssid") for item in desired.get("wlans") or [] \
+        if item.get("state") == "absent" and item.get("ssid") in existing_ssids)
+        if not (deleted_vlans or deleted_ssids):
+            return
+        removed = set(item.get("name") for item in desired.get("profiles") or [] \
+        if item.get("state") == "absent")
+        for profile in state.profiles:
+            if profile.name in removed:
+                continue
+            ssids, used = Teardown.references(profile)
+            for ssid in sorted(ssids & deleted_ssids):
+                problems.append("wlan {} is still used by profile {}; "
+                    "remove the profile too".format(ssid, profile.name))
+            for vlanId in sorted(used & deleted_vlans):
+                problems.append("wireless vlan {} is still used by profile {}; "
+                    "remove the profile too".format(vlanId, profile.name))
+
+    def site_operation(self, action, profile, site, siteId):
+        handler = Profile.assign if action == "assign" else Profile.unassign
+        return Operation(3, action, "profile site", "{} -> {}".format(profile, site),
+            None, lambda: handler(self.dnacp,
+                {"profileid": self.profile_id(profile), "siteid": siteId}))
+
+    def profile_id(self, name):
+        """Id of a profile by name, reading the list again for profiles
+        created by this run
+        """
+        with self.lock:
+            if name not in self.profile_ids:
+                self.profile_ids = dict((profile.name, profile.id) \
+                for profile in Profile.get_all(self.dnacp))
+            return self.profile_ids[name]
+
+    def vlan_batch(self, creates = None, deletes = None):
+        outcome = Wireless_VLAN.batch(self.dnacp, creates = creates, deletes = deletes)
+        if outcome.conflicts:
+            raise ValueError("; ".join("{}: {}".format(vlanId, reason) \
+            for vlanId, reason in outcome.conflicts))
+        return outcome.result
+
+    def post_wlans(self, settings):
+        return Task.from_response(self.dnacp, self.dnacp.post(
+            "/api/v1/commonsetting/wlan/-1", settings))
+
+    def run(self, operation):
+        """Run one operation; returns (tasks, error)
+        """
+        try:
+            outcome = operation.run()
+        except Exception as e:
+            return [], e
+        outcomes = outcome if isinstance(outcome, list) else [outcome]
+        tasks = [outcome for outcome in outcomes if isinstance(outcome, Task)]
+        for outcome in outcomes:
+            if isinstance(outcome, Exception):
+                return tasks, outcome
+            if isinstance(outcome, dict) and "error" in outcome:
+                return tasks, outcome["error"]
+        return tasks, None
+
+    def apply(self, plan):
+        """Run a plan phase by phase. Returns one ReconcileResult per
+        operation; status is "done", "failed", "unfinished" or "not run".
+        """
+        results = []
+        failed = False
+        for phase in range(len(PHASES)):
+            operations = [operation for operation in plan if operation.phase == phase]
+            if not operations:
+                continue
+            if failed:
+                results.extend(ReconcileResult(operation, "not run",
+                    "an earlier operation failed") for operation in operations)
+                continue
+
+            with ThreadPoolExecutor(max_workers = self.max_workers) as pool:
+                outcomes = list(pool.map(self.run, operations))
+
+            tasks = [task for operation_tasks, _ in outcomes for task in operation_tasks]
+            if tasks:
+                TaskTracker(self.dnacp, timeout = self.timeout).wait_all(tasks)
+
+            for operation, (operation_tasks, error) in zip(operations, outcomes):
+                result = self.result(operation, operation_tasks, error)
+                failed = failed or result.status != "done"
+                results.append(result)
+        return results
+
+    def result(self, operation, tasks, error):
+        if error is not None:
+            return ReconcileResult(operation, "failed", str(error))
+        for task in tasks:
+            if task.failed:
+                return ReconcileResult(operation, "failed", task.failureReason)
+        for task in tasks:
+            if not task.done:
+                return ReconcileResult(operation, "unfinished", str(task))
+        return ReconcileResult(operation, "done", None)
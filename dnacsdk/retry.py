@@ -0,0 +1,99 @@
+"""Sample usage
+from dnacsdk.api import Api
+from dnacsdk.retry import RetryPolicy
+
+retry = RetryPolicy(max_attempts=5, backoff=1, max_backoff=20, deadline=120)
+dnacp = Api(ip=DNAC_IP, username=DNAC_USERNAME, password=DNAC_PASSWORD,
+            retry=retry)
+
+# POSTs are only retried when the caller says it is safe
+dnacp.post("/api/v1/template-programmer/template/deploy", body, retry=True)
+"""
+import email.utils
+import random
+import time
+
+
+class RetryPolicy(object):
+    """Decides whether and when a failed call is attempted again.
+
+    A call is retried on connection errors, timeouts and the HTTP statuses
+    in ``statuses``, up to ``max_attempts`` attempts in total. Only the
+    idempotent ``methods`` are retried unless the caller opts in per
+    request. The wait before attempt n is a random value between 0 and
+    ``backoff * 2 ** (n - 2)`` capped at ``max_backoff`` ("full jitter"),
+    or the server's Retry-After when it sends one; a Retry-After longer
+    than ``max_backoff`` gives up instead of waiting. ``deadline`` bounds
+    the total time spent on one request, waits included.
+    """
+
+    def __init__(self, max_attempts=3, backoff=0.5, max_backoff=30, jitter=True,
+                 statuses=(429, 502, 503, 504),
+                 methods=("GET", "HEAD", "OPTIONS", "PUT", "DELETE"),
+                 deadline=None, respect_retry_after=True):
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.statuses = frozenset(statuses)
+        self.methods = frozenset(methods)
+        self.deadline = deadline
+        self.respect_retry_after = respect_retry_after
+
+    def start(self):
+        """Return the monotonic time by which a request must be done, or None
+        """
+        if self.deadline is None:
+            return None
+        return time.monotonic() + self.deadline
+
+    def remaining(self, deadline):
+        if deadline is None:
+            return None
+        return max(deadline - time.monotonic(), 0)
+
+    def retryable(self, method, retry=None):
+        if retry is not None:
+            return retry
+        return method.upper() in self.methods
+
+    def backoff_delay(self, attempt):
+        delay = min(self.max_backoff, self.backoff * (2 ** (attempt - 1)))
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        return delay
+
+    def retry_after(self, headers):
+        """Seconds requested by a Retry-After header, or None
+        """
+        value = headers.get("Retry-After") if headers is not None else None
+        if not value:
+            return None
+        try:
+            return max(float(value), 0)
+        except ValueError:
+            pass
+        parsed = email.utils.parsedate_tz(value)
+        if parsed is None:
+            return None
+        return max(email.utils.mktime_tz(parsed) - time.time(), 0)
+
+    def next_delay(self, method, attempt, deadline, headers=None, retry=None):
+        """Seconds to wait before attempt + 1, or None to give up
+        """
+        if attempt >= self.max_attempts or not self.retryable(method, retry):
+            return None
+        delay = None
+        if self.respect_retry_after:
+            delay = self.retry_after(headers)
+            if delay is not None and delay > self.max_backoff:
+                return None
+        if delay is None:
+            delay = self.backoff_delay(attempt)
+        remaining = self.remaining(deadline)
+        if remaining is not None and delay >= remaining:
+            return None
+        return delay
+
+
+NO_RETRY = RetryPolicy(max_attempts=1)
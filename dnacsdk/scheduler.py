@@ -0,0 +1,160 @@
+"""Sample usage
+from dnacsdk.scheduler import DagScheduler
+
+scheduler = DagScheduler(max_workers = 8)
+scheduler.add("unassign A", lambda: Profile.unassign(dnacp, params_a))
+scheduler.add("delete profile", lambda: Profile.delete(dnacp, params),
+              after = ["unassign A"])
+scheduler.add("delete vlan 87", delete_87, exclusive = "interface.info")
+scheduler.add("delete vlan 88", delete_88, exclusive = "interface.info")
+
+results = scheduler.run()
+seconds, path = scheduler.critical_path(results)
+"""
+import time
+from collections import namedtuple, OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+Job = namedtuple("Job", "name run after exclusive")
+
+# status is "done", "failed" or "skipped" (a job it depends on did not finish)
+JobResult = namedtuple("JobResult", "name status detail started finished")
+
+
+class DagScheduler(object):
+    """Runs jobs that depend on each other as early as their dependencies
+    allow.
+
+    A job starts once every job in its ``after`` list is done, with at most
+    max_workers jobs running at once. Jobs sharing an ``exclusive`` key
+    never run at the same time (e.g. read-modify-writes of one setting).
+    When several jobs are ready, the one with the longest chain of
+    dependents goes first. A job fails when run() raises; everything that
+    depends on it, directly or not, is skipped while independent branches
+    carry on.
+    """
+
+    def __init__(self, max_workers = 8):
+        self.max_workers = max_workers
+        self.jobs = OrderedDict()
+
+    def add(self, name, run, after = (), exclusive = None):
+        if name in self.jobs:
+            raise ValueError("Duplicate job: {}".format(name))
+        self.jobs[name] = Job(name, run, tuple(after), exclusive)
+        return self.jobs[name]
+
+    def order(self):
+        """Return the job names in dependency order; raises ValueError for
+        unknown dependencies and cycles
+        """
+        for job in self.jobs.values():
+            for parent in job.after:
+                if parent not in self.jobs:
+                    raise ValueError("{} depends on unknown job {}".format(job.name, parent))
+
+        order = []
+        state = {}
+        for name in self.jobs:
+            if name in state:
+                continue
+            state[name] = "visiting"
+            stack = [(name, iter(self.jobs[name].after))]
+            while stack:
+                current, parents = stack[-1]
+                for parent in parents:
+                    if state.get(parent) == "visiting":
+                        raise ValueError("Dependency cycle through {}".format(parent))
+                    if parent not in state:
+                        state[parent] = "visiting"
+                        stack.append((parent, iter(self.jobs[parent].after)))
+                        break
+                else:
+                    stack.pop()
+                    state[current] = "done"
+                    order.append(current)
+        return order
+
+    def heights(self, order):
+        """Length of the longest chain of jobs starting at each job
+        """
+        children = dict((name, []) for name in order)
+        for name in order:
+            for parent in self.jobs[name].after:
+                children[parent].append(name)
+        heights = {}
+        for name in reversed(order):
+            heights[name] = 1 + max([heights[child] for child in children[name]] or [0])
+        return heights
+
+    def run(self):
+        """Run every job; returns a JobResult per job name, in the order
+        the jobs were added
+        """
+        order = self.order()
+        heights = self.heights(order)
+        pending = set(order)
+        results = {}
+        running = {}
+        busy = set()
+
+        with ThreadPoolExecutor(max_workers = self.max_workers) as pool:
+            while pending or running:
+                for name in order:
+                    if name not in pending:
+                        continue
+                    failed = [parent for parent in self.jobs[name].after \
+                    if parent in results and results[parent].status != "done"]
+                    if failed:
+                        pending.discard(name)
+                        now = time.monotonic()
+                        results[name] = JobResult(name, "skipped",
+                            "{} did not finish".format(failed[0]), now, now)
+
+                ready = [name for name in pending \
+                if all(parent in results for parent in self.jobs[name].after)]
+                ready.sort(key = lambda name: -heights[name])
+                for name in ready:
+                    job = self.jobs[name]
+                    if len(running) >= self.max_workers:
+                        break
+                    if job.exclusive is not None and job.exclusive in busy:
+                        continue
+                    pending.discard(name)
+                    if job.exclusive is not None:
+                        busy.add(job.exclusive)
+                    running[pool.submit(self.call, job)] = name
+
+                if not running:
+                    continue
+                done, _ = wait(list(running), return_when = FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    busy.discard(self.jobs[name].exclusive)
+                    results[name] = future.result()
+
+        return OrderedDict((name, results[name]) for name in self.jobs)
+
+    def call(self, job):
+        started = time.monotonic()
+        try:
+            detail = job.run()
+            status = "done"
+        except Exception as e:
+            detail = str(e)
+            status = "failed"
+        return JobResult(job.name, status, detail, started, time.monotonic())
+
+    def critical_path(self, results):
+        """Return (seconds, names) of the longest chain of dependent jobs,
+        measured by how long each job actually ran
+        """
+        longest = {}
+        for name in self.order():
+            result = results[name]
+            duration = result.finished - result.started
+            parents = [longest[parent] for parent in self.jobs[name].after]
+            seconds, path = max(parents or [(0, [])], key = lambda entry: entry[0])
+            longest[name] = (seconds + duration, path + [name])
+        return max(longest.values() or [(0, [])], key = lambda entry: entry[0])
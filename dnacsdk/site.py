@@ -5,6 +5,9 @@ from dnacsdk.site import Site
 dnacp = Api(ip=DNAC_IP, username=DNAC_USERNAME, password=DNAC_PASSWORD)
 
 sites = Site.get_all(dnacp)
+
+# Look sites up by id, name or hierarchy
+site = Site.index(sites).get("Global/SJC/Bldg23")
 """
 import sys
 
@@ -19,6 +22,30 @@ class Site(object):
         site) for site in sites]
         return sites
 
+    @classmethod
+    def iter_all(cls, dnacp):
+        """Yield the sites one at a time while the response is streamed
+        """
+        for site in dnacp.get_stream("/api/v1/group/?groupType=SITE"):
+            yield Site(dnacp, site = site)
+
+    @classmethod
+    async def get_all_async(cls, dnacp):
+        sites = \
+        await dnacp.get("/api/v1/group/?groupType=SITE")
+        return [Site(dnacp, site = site) for site in sites["response"]]
+
+    @classmethod
+    def index(cls, sites):
+        """Map id, name and groupNameHierarchy to each site. A name shared by
+        several sites maps to None.
+        """
+        index = {}
+        for site in sites:
+            for key in (site.id, site.name, site.groupNameHierarchy):
+                index[key] = site if index.get(key, site) is site else None
+        return index
+
     def __init__(self, dnacp, site = None):
         try:
             self.info = site
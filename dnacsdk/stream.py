@@ -0,0 +1,215 @@
+"""Sample usage
+from dnacsdk.api import Api
+from dnacsdk.stream import iter_items
+
+dnacp = Api(ip=DNAC_IP, username=DNAC_USERNAME, password=DNAC_PASSWORD)
+
+# Items of response["response"], decoded one at a time off the socket
+for device in dnacp.get_stream("/api/v1/network-device"):
+    print(device["hostname"])
+
+# Any iterable of byte chunks works
+items = list(iter_items([b'{"response": [{"a"', b': 1}, {"a": 2}]}']))
+"""
+import codecs
+import json
+import re
+
+
+class ItemParser(object):
+    """Incremental parser for a JSON object of the form
+    {..., "<key>": [item, item, ...], ...}.
+
+    feed() takes the document in byte chunks of any size and returns the
+    items of the key's array that are complete so far; close() returns the
+    rest and checks that the document was complete. Only the item being
+    decoded and the unconsumed part of the last chunk are kept in memory,
+    so memory use does not grow with the number of items. Other keys are
+    decoded and dropped. A key whose value is not an array yields that
+    value as its only item.
+
+    An object, array or string value that is not complete when first
+    decoded is only decoded again once scan() has seen its end, so a value
+    spanning many chunks is scanned once instead of being decoded again
+    after every chunk.
+    """
+
+    whitespace = " \t\r\n"
+    special = re.compile(r'[\[\]{}"]')
+    string_special = re.compile(r'["\\]')
+    scalar_end = re.compile(r'[,\]}\s]')
+
+    def __init__(self, key = "response"):
+        self.key = key
+        self.decoder = json.JSONDecoder()
+        self.text = codecs.getincrementaldecoder("utf-8")()
+        self.buffer = ""
+        self.pos = 0
+        self.state = "start"
+        self.current = None
+        self.reset_scan()
+
+    def reset_scan(self):
+        # Progress of scan() through the value at pos: characters scanned,
+        # nesting depth, inside a string, end found
+        self.scanned = 0
+        self.depth = 0
+        self.in_string = False
+        self.scan_done = False
+
+    def feed(self, chunk):
+        self.buffer += self.text.decode(chunk)
+        return list(self.parse(final = False))
+
+    def close(self):
+        self.buffer += self.text.decode(b"", final = True)
+        items = list(self.parse(final = True))
+        if self.state != "done":
+            raise ValueError("Truncated JSON document")
+        return items
+
+    def skip(self):
+        """Move past whitespace; returns the next character or None
+        """
+        while self.pos < len(self.buffer) and self.buffer[self.pos] in self.whitespace:
+            self.pos += 1
+        return self.buffer[self.pos] if self.pos < len(self.buffer) else None
+
+    def scan(self):
+        """True once the buffer holds the end of the object, array or string
+        starting at pos. Resumes where the previous call stopped.
+        """
+        buffer = self.buffer
+        index = self.pos + self.scanned
+        depth, in_string = self.depth, self.in_string
+        while not self.scan_done:
+            if in_string:
+                match = self.string_special.search(buffer, index)
+                if match is None:
+                    index = len(buffer)
+                    break
+                if match.group() == "\\":
+                    if match.end() == len(buffer):
+                        # The escaped character is in the next chunk
+                        index = match.start()
+                        break
+                    index = match.end() + 1
+                    continue
+                in_string = False
+                index = match.end()
+                self.scan_done = depth == 0
+            else:
+                match = self.special.search(buffer, index)
+                if match is None:
+                    index = len(buffer)
+                    break
+                index = match.end()
+                char = match.group()
+                if char == '"':
+                    in_string = True
+                elif char in "[{":
+                    depth += 1
+                else:
+                    depth -= 1
+                    self.scan_done = depth == 0
+        self.scanned = index - self.pos
+        self.depth, self.in_string = depth, in_string
+        return self.scan_done
+
+    def decode(self, final):
+        """Decode the JSON value at pos; returns (True, value), or
+        (False, None) when more input is needed to be sure it is complete
+        """
+        if not final:
+            if self.buffer[self.pos] in '[{"':
+                # Most values are complete on the first try; only the
+                # others are scanned for their end before decoding again
+                if self.scanned == 0:
+                    try:
+                        value, self.pos = self.decoder.raw_decode(self.buffer, self.pos)
+                        return True, value
+                    except ValueError:
+                        pass
+                if not self.scan():
+                    return False, None
+            # A number may continue in the next chunk (e.g. "-25" + "00.5")
+            elif self.scalar_end.search(self.buffer, self.pos) is None:
+                return False, None
+        try:
+            value, end = self.decoder.raw_decode(self.buffer, self.pos)
+        except ValueError:
+            if final:
+                raise
+            return False, None
+        self.pos = end
+        self.reset_scan()
+        return True, value
+
+    def parse(self, final):
+        try:
+            while self.state != "done":
+                char = self.skip()
+                if char is None:
+                    break
+
+                if self.state == "start":
+                    if char != "{":
+                        raise ValueError("Expected a JSON object, got {!r}".format(char))
+                    self.pos += 1
+                    self.state = "key"
+
+                elif self.state == "key":
+                    if char == "}":
+                        self.pos += 1
+                        self.state = "done"
+                    elif char == ",":
+                        self.pos += 1
+                    else:
+                        complete, self.current = self.decode(final)
+                        if not complete:
+                            break
+                        self.state = "colon"
+
+                elif self.state == "colon":
+                    if char != ":":
+                        raise ValueError("Expected ':', got {!r}".format(char))
+                    self.pos += 1
+                    self.state = "value"
+
+                elif self.state == "value":
+                    if self.current == self.key and char == "[":
+                        self.pos += 1
+                        self.state = "items"
+                        continue
+                    complete, value = self.decode(final)
+                    if not complete:
+                        break
+                    self.state = "key"
+                    if self.current == self.key:
+                        yield value
+
+                elif self.state == "items":
+                    if char == "]":
+                        self.pos += 1
+                        self.state = "key"
+                    elif char == ",":
+                        self.pos += 1
+                    else:
+                        complete, value = self.decode(final)
+                        if not complete:
+                            break
+                        yield value
+        finally:
+            self.buffer = self.buffer[self.pos:]
+            self.pos = 0
+
+
+def iter_items(chunks, key = "response"):
+    """Yield the items of document[key] from an iterable of byte chunks
+    """
+    parser = ItemParser(key)
+    for chunk in chunks:
+        for item in parser.feed(chunk):
+            yield item
+    for item in parser.close():
+        yield item
@@ -0,0 +1,137 @@
+"""Sample usage
+from dnacsdk.api import Api
+from dnacsdk.task import TaskTracker
+from dnacsdk.wlan import Wlan
+
+dnacp = Api(ip=DNAC_IP, username=DNAC_USERNAME, password=DNAC_PASSWORD)
+
+tasks = [Wlan.create(dnacp, {"ssid": ssid}) for ssid in ("guest", "staff")]
+
+for task in TaskTracker(dnacp).as_completed(tasks):
+    print(task.id, "failed" if task.failed else "done", task.failureReason)
+"""
+from .poller import Poller
+
+
+class Task(object):
+    """Handle for an asynchronous controller task (/api/v1/task/{taskId}).
+
+    Writes to commonsetting and siteprofile return a task instead of
+    applying the change immediately; wait for it with TaskTracker. Once a
+    refresh sees the task finish, the cached reads the write affects are
+    evicted again.
+    """
+
+    @classmethod
+    def api(cls, taskId):
+        return "/api/v1/task/{}".format(taskId)
+
+    @classmethod
+    def from_response(cls, dnacp, response):
+        """Return a Task for a write response that carries a taskId, or the
+        response unchanged
+        """
+        if isinstance(response, dict) and isinstance(response.get("response"), dict) \
+                and "taskId" in response["response"]:
+            return Task(dnacp, response["response"]["taskId"],
+                url = response["response"].get("url"))
+        return response
+
+    def __init__(self, dnacp, taskId, url = None):
+        self.dnacp = dnacp
+        self.id = taskId
+        self.url = url
+        self.info = None
+
+    def refresh(self):
+        """Read the task's current state. An error payload from the
+        controller is returned as is and leaves info unchanged.
+        """
+        return self.update(self.dnacp.get(Task.api(self.id), bypass_cache = True))
+
+    async def refresh_async(self):
+        return self.update(await self.dnacp.get(Task.api(self.id), bypass_cache = True))
+
+    def update(self, task):
+        if "error" in task:
+            return task
+        self.info = task["response"]
+        self.finished()
+        return self.info
+
+    def finished(self):
+        if Task.is_final(self.info) and hasattr(self.dnacp, "task_finished"):
+            self.dnacp.task_finished(self.id)
+
+    @classmethod
+    def is_final(cls, info):
+        return bool(info.get("isError")) or info.get("endTime") is not None
+
+    @property
+    def done(self):
+        return self.info is not None and Task.is_final(self.info)
+
+    @property
+    def failed(self):
+        return self.info is not None and bool(self.info.get("isError"))
+
+    @property
+    def failureReason(self):
+        return None if self.info is None else self.info.get("failureReason")
+
+    @property
+    def progress(self):
+        return None if self.info is None else self.info.get("progress")
+
+    def __str__(self):
+        if self.info is None:
+            return "taskId: {}".format(self.id)
+        return "taskId: {} progress: {}{}".format(self.id, self.progress,
+            " failed: {}".format(self.failureReason) if self.failed else "")
+
+    def __repr__(self):
+        return "<Task {}>".format(self.id)
+
+
+class TaskTracker(object):
+    """Waits for many tasks at once.
+
+    Tasks are polled concurrently, at most max_workers at a time, with
+    exponential backoff between polls of the same task (see Poller).
+    Tasks still running when timeout expires are left in unfinished.
+    """
+
+    def __init__(self, dnacp, max_workers = 8, initial_delay = 1, max_delay = 30,
+        timeout = 600):
+        self.dnacp = dnacp
+        self.tasks = {}
+        self.poller = Poller(
+            fetch = lambda taskId: self.tasks[taskId].refresh(),
+            is_final = Task.is_final,
+            max_workers = max_workers,
+            initial_delay = initial_delay,
+            max_delay = max_delay,
+            timeout = timeout)
+
+    @property
+    def unfinished(self):
+        return [self.tasks[taskId] for taskId in self.poller.unfinished]
+
+    def as_completed(self, tasks):
+        """Yield each task as soon as it finishes (or polling it fails)
+        """
+        tasks = [task for task in tasks if isinstance(task, Task)]
+        self.tasks = dict((task.id, task) for task in tasks)
+        for taskId, info in self.poller.poll(list(self.tasks)):
+            task = self.tasks[taskId]
+            if isinstance(info, Exception):
+                task.info = {"isError": True, "failureReason": str(info)}
+                yield task
+            elif Task.is_final(info):
+                yield task
+
+    def wait_all(self, tasks):
+        """Block until every task finishes or the timeout expires; returns
+        the finished tasks
+        """
+        return list(self.as_completed(tasks))
@@ -0,0 +1,189 @@
+"""Sample usage
+from dnacsdk.api import Api
+from dnacsdk.teardown import Teardown
+
+dnacp = Api(ip=DNAC_IP, username=DNAC_USERNAME, password=DNAC_PASSWORD)
+
+teardown = Teardown(dnacp, max_workers = 8)
+scheduler = teardown.plan(profiles = ["Guest", "Event"], wireless_vlans = [86])
+for job in scheduler.jobs.values():
+    print(job.name, "after", list(job.after))
+
+report = teardown.run(scheduler)
+for result in report.results.values():
+    print(result.name, result.status, result.detail)
+print("Took {:.1f}s, critical path {:.1f}s".format(report.elapsed,
+      report.critical_path_seconds))
+"""
+import time
+from collections import namedtuple
+
+from .exceptions import TaskFailed
+from .profile import Profile
+from .scheduler import DagScheduler
+from .task import Task, TaskTracker
+from .wireless_vlan import Wireless_VLAN
+from .wlan import Wlan
+
+
+TeardownReport = namedtuple("TeardownReport",
+    "results elapsed critical_path_seconds critical_path kept")
+
+
+class Teardown(object):
+    """Removes a WLAN design: profiles, their site assignments, and the
+    WLANs and wireless VLANs they use.
+
+    plan() builds a DagScheduler with one job per object. A profile is
+    deleted after all its sites are unassigned; a WLAN or wireless VLAN is
+    deleted after every profile using it (its wireless.ssid and
+    wireless.vlanId attributes) is deleted. WLANs and VLANs still used by
+    profiles that are not being removed are kept and listed in kept.
+    Wireless VLANs live in one shared setting, so they are all deleted by
+    a single batch rewrite (Wireless_VLAN.batch) that runs once every
+    profile using any of them is deleted; everything else runs
+    concurrently as soon as its dependencies are done. Each job waits for
+    its controller task, and when one fails the jobs depending on it are
+    skipped.
+    """
+
+    max_workers = 8
+
+    def __init__(self, dnacp, max_workers = None, timeout = 600):
+        self.dnacp = dnacp
+        self.max_workers = max_workers or self.max_workers
+        self.timeout = timeout
+        self.kept = []
+
+    @classmethod
+    def references(cls, profile):
+        """(ssids, vlanIds) a profile refers to
+        """
+        ssids, vlanIds = set(), set()
+        for attribute in profile.info.get("profileAttributes") or []:
+            if attribute.get("key") != "wireless.ssid":
+                continue
+            ssids.add(attribute.get("value"))
+            for attrib in attribute.get("attribs") or []:
+                if attrib.get("key") == "wireless.vlanId":
+                    vlanIds.add(str(attrib.get("value")))
+        return ssids, vlanIds
+
+    def plan(self, profiles = (), wlans = (), wireless_vlans = ()):
+        """Return a DagScheduler holding the teardown jobs. Raises
+        ValueError for unknown profiles.
+        """
+        all_profiles = Profile.get_all(self.dnacp)
+        by_name = dict((profile.name, profile) for profile in all_profiles)
+        unknown = [name for name in profiles if name not in by_name]
+        if unknown:
+            raise ValueError("Unknown profiles: {}".format(", ".join(unknown)))
+        targets = [by_name[name] for name in dict.fromkeys(profiles)]
+        Profile.prefetch_sites(self.dnacp, targets, max_workers = self.max_workers)
+
+        scheduler = DagScheduler(max_workers = self.max_workers)
+        users = {}
+        for profile in all_profiles:
+            ssids, vlanIds = self.references(profile)
+            for reference in [("wlan", ssid) for ssid in ssids] + \
+                    [("wireless vlan", vlanId) for vlanId in vlanIds]:
+                users.setdefault(reference, []).append(profile)
+
+        ssids = list(dict.fromkeys(list(wlans) + \
+        [ssid for profile in targets for ssid in sorted(self.references(profile)[0])]))
+        vlanIds = list(dict.fromkeys([str(vlanId) for vlanId in wireless_vlans] + \
+        [vlanId for profile in targets for vlanId in sorted(self.references(profile)[1])]))
+
+        deleted = set(profile.id for profile in targets)
+        for profile in targets:
+            unassigns = []
+            for site in profile.sites:
+                # Site names repeat across buildings, the uuid keeps jobs unique
+                name = "unassign profile {} from {} ({})".format(profile.name,
+                    site.name, site.uuid)
+                scheduler.add(name, self.job(Profile.unassign,
+                    {"profileid": profile.id, "siteid": site.uuid}))
+                unassigns.append(name)
+            scheduler.add("delete profile {}".format(profile.name),
+                self.job(Profile.delete, {"id": profile.id}), after = unassigns)
+
+        existing_wlans = dict((wlan.ssid, wlan) for wlan in Wlan.get_all(self.dnacp)) \
+        if ssids else {}
+        existing_vlans = set(str(wireless_vlan.vlanId) \
+        for wireless_vlan in Wireless_VLAN.get_all(self.dnacp)) if vlanIds else set()
+
+        self.kept = []
+        for ssid in ssids:
+            if ssid in existing_wlans:
+                after = self.blockers("wlan", ssid, users, deleted)
+                if after is not None:
+                    scheduler.add("delete wlan {}".format(ssid), self.job(Wlan.delete,
+                        {"key": existing_wlans[ssid].key}), after = after)
+
+        deletes, after = [], []
+        for vlanId in vlanIds:
+            if vlanId in existing_vlans:
+                blockers = self.blockers("wireless vlan", vlanId, users, deleted)
+                if blockers is not None:
+                    deletes.append({"vlanId": vlanId})
+                    after.extend(blockers)
+        if deletes:
+            scheduler.add("delete wireless vlans {}".format(", ".join(params["vlanId"] \
+                for params in deletes)), self.job(self.delete_vlans, deletes),
+                after = list(dict.fromkeys(after)))
+
+        return scheduler
+
+    def blockers(self, kind, key, users, deleted):
+        """Names of the profile deletions a WLAN or VLAN deletion must wait
+        for, or None (and the object added to kept) when a profile that
+        stays uses it
+        """
+        profiles = users.get((kind, key), [])
+        remaining = [profile.name for profile in profiles if profile.id not in deleted]
+        if remaining:
+            self.kept.append((kind, key, "used by {}".format(", ".join(remaining))))
+            return None
+        return ["delete profile {}".format(profile.name) for profile in profiles]
+
+    @classmethod
+    def delete_vlans(cls, dnacp, deletes):
+        """Delete many wireless VLANs in one read-modify-write
+        """
+        outcome = Wireless_VLAN.batch(dnacp, deletes = deletes)
+        if outcome.conflicts:
+            raise TaskFailed("; ".join("{}: {}".format(vlanId, reason) \
+            for vlanId, reason in outcome.conflicts))
+        return outcome.result
+
+    def job(self, operation, params):
+        """Wrap a Profile/Wlan/Wireless_VLAN call so that it returns once its
+        task is done and raises when the call or the task failed
+        """
+        def run():
+            outcome = operation(self.dnacp, params)
+            if isinstance(outcome, Exception):
+                raise outcome
+            if isinstance(outcome, dict) and "error" in outcome:
+                raise TaskFailed(outcome["error"])
+            if isinstance(outcome, Task):
+                TaskTracker(self.dnacp, max_workers = 1,
+                    timeout = self.timeout).wait_all([outcome])
+                if outcome.failed:
+                    raise TaskFailed(outcome.failureReason)
+                if not outcome.done:
+                    raise TaskFailed("{} still running after {}s".format(outcome,
+                        self.timeout))
+                return str(outcome)
+            return None
+        return run
+
+    def run(self, scheduler):
+        """Run the planned jobs; returns a TeardownReport with the wall time
+        and the critical path, the chain of dependent jobs that bounded it
+        """
+        started = time.monotonic()
+        results = scheduler.run()
+        elapsed = time.monotonic() - started
+        seconds, path = scheduler.critical_path(results)
+        return TeardownReport(results, elapsed, seconds, path, list(self.kept))
@@ -1,6 +1,6 @@
 """Sample usage
 from dnacsdk.api import Api
-from dnacsdk.templateProgrammer import Template
+from dnacsdk.templateProgrammer import Template, DeploymentTracker
 
 sample_template_name = "NetworkDeviceOnboarding"
 sample_target_device = "10.32.250.6"
@@ -17,64 +17,246 @@ deploy_params = {
     }
 
 deployment = template.deploy(dnacp, sample_target_device, deploy_params)
+
+# Many targets, packed into as few deploy calls as possible
+deployments = template.deploy_many(dnacp, [
+        ("10.32.250.6", deploy_params),
+        ("10.32.250.7", dict(deploy_params, VLAN = "1023")),
+    ])
+
+# Stream per-device status changes until every deployment finishes
+for event in DeploymentTracker(dnacp, timeout = 300).track(deployments):
+    print(event.deploymentId, event.deviceId, event.status)
 """
 
 
+import asyncio
+import re
+import threading
+from collections import namedtuple
+
+from . import util
+from .exceptions import ResourceNotFound
+from .poller import Poller
+
+
+class TemplateCatalog(object):
+    """Index of the template list endpoint.
+
+    Maps templateId, name and project/name to the summary entries returned by
+    /api/v1/template-programmer/template, so a template can be resolved by
+    name with a single list request. Each Api has its own catalog, returned
+    by TemplateCatalog.shared(). Creating, updating, committing or deleting
+    templates or projects through the same Api marks it for reloading.
+    """
+
+    invalidated_by = re.compile(
+        r"^/?api/v1/template-programmer/(project|template(?!/deploy))")
+
+    _shared_lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, dnacp):
+        """Return the catalog belonging to dnacp. It is kept on the Api
+        object itself, so it goes away with it.
+        """
+        with cls._shared_lock:
+            catalog = getattr(dnacp, "_template_catalog", None)
+            if catalog is None:
+                catalog = dnacp._template_catalog = cls(dnacp)
+        return catalog
+
+    def __init__(self, dnacp):
+        self.dnacp = dnacp
+        self.entries = {}
+        self.by_name = {}
+        self.loaded = False
+        self.lock = threading.Lock()
+        if hasattr(dnacp, "add_write_listener"):
+            dnacp.add_write_listener(self.on_write)
+
+    def on_write(self, method, action):
+        if self.invalidated_by.match(action):
+            with self.lock:
+                self.loaded = False
+
+    def load(self):
+        """(Re)read the template list
+        """
+        util.require_sync(self.dnacp, "TemplateCatalog", "Template.get_all_async")
+        templates = self.dnacp.get("/api/v1/template-programmer/template",
+            bypass_cache = True)
+        entries = {}
+        by_name = {}
+        for template in templates:
+            entries[template["templateId"]] = template
+            by_name.setdefault(template["name"], []).append(template)
+        with self.lock:
+            self.entries = entries
+            self.by_name = by_name
+            self.loaded = True
+        return self
+
+    def summaries(self):
+        if not self.loaded:
+            self.load()
+        return list(self.entries.values())
+
+    def find(self, name, project = None):
+        """Return the summary for a template name (optionally within a
+        project), or None. Reloads the list once on a miss.
+        """
+        reloaded = False
+        if not self.loaded:
+            self.load()
+            reloaded = True
+        while True:
+            for template in self.by_name.get(name, []):
+                if project is None or template.get("projectName") == project:
+                    return template
+            if reloaded:
+                return None
+            self.load()
+            reloaded = True
+
+
 class Template(object):
 
     @classmethod
     def get_all(cls, dnacp):
-        templates = dnacp.get("/api/v1/template-programmer/template")
-        return [Template(dnacp, templateId = template["templateId"]) for template in templates]
+        catalog = TemplateCatalog.shared(dnacp).load()
+        return [Template(dnacp, summary = template) for template in catalog.summaries()]
 
     @classmethod
-    def __get_id__(cls, name, dnacp):
-        templates = cls.get_all(dnacp)
-        for template in templates:
-            if name == template.name:
-                return template.id
+    async def get_all_async(cls, dnacp):
+        """get_all for an AsyncApi. The returned templates only carry the
+        catalog summary; await template.load_async() before reading info
+        or versions.
+        """
+        templates = await dnacp.get("/api/v1/template-programmer/template")
+        return [Template(dnacp, summary = template) for template in templates]
+
+    @classmethod
+    def __get_id__(cls, name, dnacp, project = None):
+        template = TemplateCatalog.shared(dnacp).find(name, project)
+        if template is not None:
+            return template["templateId"]
 
 
-    def __init__(self, dnacp, templateId = None, name = None):
-        if not templateId is None:
+    def __init__(self, dnacp, templateId = None, name = None, project = None,
+        summary = None):
+        """Template handle. Body and versions are fetched on first access
+        of info, versions or latest_version.
+        """
+        if not summary is None:
+            templateId = summary["templateId"]
+        elif not templateId is None:
             pass
         elif not name is None:
-            templateId = Template.__get_id__(name = name, dnacp = dnacp)
+            summary = TemplateCatalog.shared(dnacp).find(name, project)
+            if summary is None:
+                raise ResourceNotFound(None,
+                    "No template named {}".format(name))
+            templateId = summary["templateId"]
+
+        self.dnacp = dnacp
+        self.id = templateId
+        self.summary = summary or {}
+        self._info = None
+        self._versions = None
+
+    def info_api(self):
+        return "/api/v1/template-programmer/template/{}".format(self.id)
+
+    def versions_api(self):
+        return "/api/v1/template-programmer/template/version/{}".format(self.id)
+
+    @property
+    def info(self):
+        if self._info is None:
+            util.require_sync(self.dnacp, "Template.info", "await template.load_async()")
+            self._info = self.dnacp.get(self.info_api())
+        return self._info
+
+    @property
+    def name(self):
+        if "name" in self.summary:
+            return self.summary["name"]
+        return self.info["name"]
+
+    @property
+    def versions(self):
+        if self._versions is None:
+            util.require_sync(self.dnacp, "Template.versions", "await template.load_async()")
+            self._versions = self.dnacp.get(self.versions_api())[0]["versionsInfo"]
+        return self._versions
+
+    async def load_async(self):
+        """Fetch info and versions with an AsyncApi, so that the lazy
+        properties can be read afterwards
+        """
+        self._info, versions = await asyncio.gather(
+            self.dnacp.get(self.info_api()), self.dnacp.get(self.versions_api()))
+        self._versions = versions[0]["versionsInfo"]
+        return self
 
-        template = dnacp.get("/api/v1/template-programmer/template/{}"
-            .format(templateId))
+    @property
+    def latest_version(self):
+        return self.versions[1]
 
-        self.info = template
-        self.id = self.info["id"]
-        self.name = self.info["name"]
+    @property
+    def input_params(self):
+        return [param["parameterName"] for param in self.info["templateParams"] ]
 
-        self.versions = dnacp.get("/api/v1/template-programmer/template/version/{}"
-            .format(templateId))[0]["versionsInfo"]
-        self.latest_version = self.versions[1]
-        self.input_params = [param["parameterName"] for param in self.info["templateParams"] ]
+    deploy_batch_size = 100
 
     def deploy(self, dnacp, target_device_ip, params):
 
         if not self.__deploy_param_check__(params):
             raise ValueError("Provided deploy parameters invalid.")
 
-        body = {
+        deployment = dnacp.post("/api/v1/template-programmer/template/deploy",
+                self.deploy_body([(target_device_ip, params)])
+            )
+
+        return deployment["deploymentId"]
+
+    def deploy_many(self, dnacp, targets, batch_size = None):
+        """Deploy to many devices, packing up to batch_size targets into each
+        /template/deploy call.
+
+        targets is a list of (target_device_ip, params) pairs. Returns the
+        deployment ids, one per call.
+        """
+        targets = list(targets)
+        for target_device_ip, params in targets:
+            if not self.__deploy_param_check__(params):
+                raise ValueError("Provided deploy parameters invalid for {}."
+                    .format(target_device_ip))
+
+        batch_size = batch_size or self.deploy_batch_size
+        deployments = []
+        for start in range(0, len(targets), batch_size):
+            deployment = dnacp.post("/api/v1/template-programmer/template/deploy",
+                    self.deploy_body(targets[start:start + batch_size])
+                )
+            deployments.append(deployment["deploymentId"])
+
+        return deployments
+
+    def deploy_body(self, targets):
+        return {
           "targetInfo": [
             {
               "id": target_device_ip,
               "type": "MANAGED_DEVICE_IP",
               "params": params
             }
+            for target_device_ip, params in targets
           ],
           "templateId": self.latest_version["id"]
         }
 
-        deployment = dnacp.post("/api/v1/template-programmer/template/deploy",
-                body
-            )
-
-        return deployment["deploymentId"]
-
     @classmethod
     def deployment_status(cls, dnacp, deploymentId):
         api = "/api/v1/template-programmer/template/deploy/status/{}".format(
@@ -84,3 +266,68 @@ class Template(object):
 
     def __deploy_param_check__(self, params):
         return sorted(self.input_params) == sorted(list(params.keys()))
+
+
+DeploymentEvent = namedtuple("DeploymentEvent",
+    ["deploymentId", "deviceId", "status", "detail", "final"])
+
+
+class DeploymentTracker(object):
+    """Follows many template deployments until they finish.
+
+    Deployment statuses are polled concurrently with exponential backoff
+    (see Poller). track() yields a DeploymentEvent each time a device's
+    status changes, and one event with deviceId None when a deployment
+    reaches a final state, after which that deployment is no longer polled.
+    """
+
+    pending_states = ("INIT", "NOT_STARTED", "IN_PROGRESS")
+
+    def __init__(self, dnacp, max_workers = 8, initial_delay = 1, max_delay = 30,
+        timeout = 600):
+        self.dnacp = dnacp
+        self.poller = Poller(
+            fetch = lambda deploymentId: Template.deployment_status(dnacp, deploymentId),
+            is_final = self.is_final,
+            max_workers = max_workers,
+            initial_delay = initial_delay,
+            max_delay = max_delay,
+            timeout = timeout)
+
+    @classmethod
+    def is_final(cls, status):
+        return status.get("status") not in cls.pending_states
+
+    @property
+    def unfinished(self):
+        """Deployments still pending when the timeout expired
+        """
+        return self.poller.unfinished
+
+    def track(self, deploymentIds):
+        seen = {}
+        for deploymentId, status in self.poller.poll(deploymentIds):
+            if isinstance(status, Exception):
+                yield DeploymentEvent(deploymentId, None, "ERROR", str(status), True)
+                continue
+
+            for device in status.get("devices", []):
+                key = (deploymentId, device.get("deviceId"))
+                if seen.get(key) != device.get("status"):
+                    seen[key] = device.get("status")
+                    yield DeploymentEvent(deploymentId, device.get("deviceId"),
+                        device.get("status"), device.get("detailedStatusMessage"), False)
+
+            if self.is_final(status):
+                yield DeploymentEvent(deploymentId, None, status.get("status"),
+                    None, True)
+
+    def wait(self, deploymentIds):
+        """Block until all deployments finish (or the timeout expires) and
+        return the final status of each finished one
+        """
+        final = {}
+        for event in self.track(deploymentIds):
+            if event.final:
+                final[event.deploymentId] = event.status
+        return final
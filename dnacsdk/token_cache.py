@@ -0,0 +1,110 @@
+"""Sample usage
+from dnacsdk.api import Api
+
+# Tokens are reused across processes until they are about to expire
+dnacp = Api(ip=DNAC_IP, username=DNAC_USERNAME, password=DNAC_PASSWORD,
+            token_cache="~/.dnacsdk/tokens.json")
+"""
+import json
+import os
+import stat
+import tempfile
+import threading
+import time
+
+
+class TokenCache(object):
+    """File-backed store of auth tokens keyed by controller IP and user.
+
+    The file and its directory are only accessible by the owner (0600/0700).
+    A cache file that group or others can read is ignored and replaced. An
+    existing directory that belongs to another user, or that group or
+    others can write to, is not used at all: nothing is read from or
+    written to it.
+    """
+
+    def __init__(self, path):
+        self.path = os.path.expanduser(path)
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key(ip, username):
+        return "{}|{}".format(ip, username)
+
+    def directory(self):
+        return os.path.dirname(self.path) or "."
+
+    def safe_directory(self):
+        """True if the cache directory is missing or only its owner, the
+        current user, can write to it
+        """
+        if os.name != "posix":
+            return True
+        try:
+            info = os.stat(self.directory())
+        except (IOError, OSError):
+            return True
+        if info.st_uid != os.getuid():
+            return False
+        return not info.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+
+    def read(self):
+        """Return the cache file contents, or {} if missing or unsafe
+        """
+        if not self.safe_directory():
+            return {}
+        try:
+            with open(self.path, "r") as cache_file:
+                if os.name == "posix":
+                    mode = os.fstat(cache_file.fileno()).st_mode
+                    if mode & (stat.S_IRWXG | stat.S_IRWXO):
+                        return {}
+                entries = json.load(cache_file)
+        except (IOError, OSError, ValueError):
+            return {}
+        return entries if isinstance(entries, dict) else {}
+
+    def write(self, entries):
+        """Atomically replace the cache file with owner-only permissions.
+        Does nothing when the directory is unsafe.
+        """
+        if not self.safe_directory():
+            return
+        directory = self.directory()
+        if not os.path.isdir(directory):
+            os.makedirs(directory, 0o700)
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".tokens")
+        try:
+            with os.fdopen(fd, "w") as temp_file:
+                json.dump(entries, temp_file)
+            os.chmod(temp_path, 0o600)
+            os.replace(temp_path, self.path)
+        except Exception:
+            os.unlink(temp_path)
+            raise
+
+    def load(self, ip, username, margin=0):
+        """Return (token, expires_at) for ip/username, or None if there is
+        no entry or it expires within margin seconds
+        """
+        entry = self.read().get(self.key(ip, username))
+        if not entry or entry.get("expires_at") is None:
+            return None
+        if time.time() >= entry["expires_at"] - margin:
+            return None
+        return entry["token"], entry["expires_at"]
+
+    def store(self, ip, username, token, expires_at):
+        with self.lock:
+            entries = self.read()
+            now = time.time()
+            entries = dict((key, entry) for key, entry in entries.items()
+                           if entry.get("expires_at", 0) > now)
+            entries[self.key(ip, username)] = {"token": token, "expires_at": expires_at}
+            self.write(entries)
+
+    def discard(self, ip, username):
+        with self.lock:
+            entries = self.read()
+            if entries.pop(self.key(ip, username), None) is not None:
+                self.write(entries)
@@ -1,5 +1,11 @@
+import base64
+import csv
+import json
+import os
 import re
 
+from . import exceptions
+
 try:
     from urllib.parse import urlencode
 except ImportError:
@@ -38,4 +44,110 @@ def merge_dict(data, *override):
     result = {}
     for current_dict in (data,) + override:
         result.update(current_dict)
-    return result
\ No newline at end of file
+    return result
+
+def min_timeout(*timeouts):
+    """
+    Returns the smallest of the given timeouts, ignoring None, or None if
+    all are None.
+    Usage::
+        >>> util.min_timeout(30, None, 12.5)
+        12.5
+    """
+    timeouts = [timeout for timeout in timeouts if timeout is not None]
+    return min(timeouts) if timeouts else None
+
+
+def require_sync(dnacp, name, instead=None):
+    """
+    Raises TypeError when dnacp is an AsyncApi, for code paths that only
+    work with the blocking Api.
+    Usage::
+        >>> util.require_sync(dnacp, "Profile.sites", "await profile.fetch_sites_async()")
+    """
+    if getattr(dnacp, "is_async", False):
+        message = "{} needs a blocking Api, not an AsyncApi".format(name)
+        if instead:
+            message += "; use {}".format(instead)
+        raise TypeError(message)
+
+
+def jwt_claims(token):
+    """
+    Returns the claims of a JWT without verifying its signature, or an
+    empty dictionary if the token cannot be decoded.
+    Usage::
+        >>> util.jwt_claims(token)["exp"]
+        1530000000
+    """
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return json.loads(base64.urlsafe_b64decode(payload.encode("ascii")).decode("utf-8"))
+    except (AttributeError, IndexError, TypeError, ValueError):
+        return {}
+
+
+def load_rows(path):
+    """
+    Reads a list of records from a CSV, JSON or YAML file. CSV files need a
+    header row. YAML requires the optional PyYAML package.
+    Usage::
+        >>> util.load_rows("targets.csv")
+        [{'target': 'switch1', 'VLAN': '3001'}]
+    """
+    if os.path.splitext(path)[1].lower() == ".csv":
+        with open(path, "r") as rows_file:
+            return [dict(row) for row in csv.DictReader(rows_file)]
+    return load_document(path)
+
+
+def load_document(path):
+    """
+    Reads a JSON or YAML document. YAML requires the optional PyYAML package.
+    Usage::
+        >>> util.load_document("desired.yaml")
+        {'wlans': [{'ssid': 'guest'}]}
+    """
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, "r") as document_file:
+        if extension == ".json":
+            return json.load(document_file)
+        if extension in (".yaml", ".yml"):
+            try:
+                import yaml
+            except ImportError:
+                raise exceptions.MissingConfig("Reading YAML files requires the PyYAML package")
+            return yaml.safe_load(document_file)
+    raise ValueError("Unsupported file type: {}".format(path))
+
+
+def save_rows(path, rows):
+    """
+    Writes a list of records to a CSV, JSON or YAML file, the counterpart of
+    load_rows.
+    Usage::
+        >>> util.save_rows("retry.csv", [{'target': 'switch1', 'VLAN': '3001'}])
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError:
+            raise exceptions.MissingConfig("Writing YAML files requires the PyYAML package")
+    elif extension not in (".csv", ".json"):
+        raise ValueError("Unsupported file type: {}".format(path))
+
+    rows = list(rows)
+    with open(path, "w") as rows_file:
+        if extension == ".csv":
+            fields = []
+            for row in rows:
+                fields.extend(field for field in row if field not in fields)
+            writer = csv.DictWriter(rows_file, fieldnames = fields)
+            writer.writeheader()
+            writer.writerows(rows)
+        elif extension == ".json":
+            json.dump(rows, rows_file, indent = 2)
+        else:
+            yaml.safe_dump(rows, rows_file, default_flow_style = False)
@@ -15,15 +15,39 @@ create_params = {
                 }
 
 creation = Wireless_VLAN.create(dnacp, create_params)
+
+# Many changes in one read-modify-write of the global interface list
+outcome = Wireless_VLAN.batch(dnacp,
+    creates = [{"interfaceName": "Guest", "vlanId": 88}],
+    deletes = [{"vlanId": 87}])
 """
 import sys
+from collections import namedtuple, OrderedDict
+
+from .exceptions import ConcurrentModification
+from .task import Task, TaskTracker
+
+VlanBatchResult = namedtuple("VlanBatchResult",
+    ["created", "deleted", "skipped", "conflicts", "result"])
 
 class Wireless_VLAN(object):
 
     @classmethod
-    def get_all(cls, dnacp):
+    def get_all(cls, dnacp, bypass_cache = False):
         wireless_vlans = \
-        dnacp.get("/api/v1/commonsetting/global/-1?key=interface.info")
+        dnacp.get("/api/v1/commonsetting/global/-1?key=interface.info", \
+        bypass_cache = bypass_cache)
+        return cls.from_response(dnacp, wireless_vlans)
+
+    @classmethod
+    async def get_all_async(cls, dnacp, bypass_cache = False):
+        wireless_vlans = \
+        await dnacp.get("/api/v1/commonsetting/global/-1?key=interface.info", \
+        bypass_cache = bypass_cache)
+        return cls.from_response(dnacp, wireless_vlans)
+
+    @classmethod
+    def from_response(cls, dnacp, wireless_vlans):
         wireless_vlans = wireless_vlans["response"][0]["value"]
         wireless_vlans = [Wireless_VLAN(dnacp, wireless_vlan = \
         wireless_vlan) for wireless_vlan in wireless_vlans]
@@ -38,21 +62,17 @@ class Wireless_VLAN(object):
             print("Parameters invalid")
             sys.exit()
 
-
     @classmethod
-    def create(self, dnacp, create_params = None):
-        new_vlan = Wireless_VLAN(dnacp, wireless_vlan = create_params)
-
-        wireless_vlans = self.get_all(dnacp)
-        wireless_vlans.append(new_vlan)
+    def interface_body(cls, wireless_vlans):
+        """commonsetting body that replaces the global interface.info list
+        """
         value = []
 
         for wireless_vlan in wireless_vlans:
             value.append({"interfaceName":wireless_vlan.interfaceName, \
             "vlanId":wireless_vlan.vlanId})
 
-
-        body = [
+        return [
                     {
                         "instanceType":"interface",
                         "namespace":"global",
@@ -65,55 +85,178 @@ class Wireless_VLAN(object):
                     }
                 ]
 
+    @classmethod
+    def without(cls, wireless_vlans, vlanId):
+        return [wireless_vlan for wireless_vlan in wireless_vlans \
+        if str(wireless_vlan.vlanId) != str(vlanId)]
+
+    @classmethod
+    def create(self, dnacp, create_params = None):
+        new_vlan = Wireless_VLAN(dnacp, wireless_vlan = create_params)
+
+        wireless_vlans = self.get_all(dnacp, bypass_cache = True)
+        wireless_vlans.append(new_vlan)
+
         creation = ""
         try:
             creation = \
             dnacp.post("/api/v1/commonsetting/global/-1?key=interface.info", \
-            body)
+            self.interface_body(wireless_vlans))
         except Exception as e:
             creation = e
             print(e)
 
 
-        return creation
+        return Task.from_response(dnacp, creation)
 
     @classmethod
-    def delete(self, dnacp, delete_params = None):
-        wireless_vlans = self.get_all(dnacp)
-        value = []
+    async def create_async(cls, dnacp, create_params = None):
+        new_vlan = Wireless_VLAN(dnacp, wireless_vlan = create_params)
 
-        for wireless_vlan in wireless_vlans:
-            if str(wireless_vlan.vlanId) != delete_params["vlanId"]:
-                value.append({"interfaceName":wireless_vlan.interfaceName, \
-                "vlanId":wireless_vlan.vlanId})
+        wireless_vlans = await cls.get_all_async(dnacp, bypass_cache = True)
+        wireless_vlans.append(new_vlan)
 
+        creation = ""
+        try:
+            creation = \
+            await dnacp.post("/api/v1/commonsetting/global/-1?key=interface.info", \
+            cls.interface_body(wireless_vlans))
+        except Exception as e:
+            creation = e
+            print(e)
 
-        body = [
-                    {
-                        "instanceType":"interface",
-                        "namespace":"global",
-                        "type":"interface.setting",
-                        "key":"interface.info",
-                        "value":value,
-                        "groupUuid":"-1",
-                        "inheritedGroupUuid":"",
-                        "inheritedGroupName":""
-                    }
-                ]
+        return Task.from_response(dnacp, creation)
 
+    @classmethod
+    def delete(self, dnacp, delete_params = None):
+        wireless_vlans = self.without(self.get_all(dnacp, bypass_cache = True), delete_params["vlanId"])
+
+        deletion = ""
         try:
             deletion = \
             dnacp.post("/api/v1/commonsetting/global/-1?key=interface.info", \
-            body)
+            self.interface_body(wireless_vlans))
+        except Exception as e:
+            deletion = e
+            print(e)
+
+
+        return Task.from_response(dnacp, deletion)
+
+    @classmethod
+    async def delete_async(cls, dnacp, delete_params = None):
+        wireless_vlans = cls.without(await cls.get_all_async(dnacp, bypass_cache = True), delete_params["vlanId"])
+
+        deletion = ""
+        try:
+            deletion = \
+            await dnacp.post("/api/v1/commonsetting/global/-1?key=interface.info", \
+            cls.interface_body(wireless_vlans))
         except Exception as e:
+            deletion = e
             print(e)
 
+        return Task.from_response(dnacp, deletion)
+
+    @classmethod
+    def plan_batch(cls, wireless_vlans, creates = None, deletes = None):
+        """Apply creates and deletes to a list of Wireless_VLAN in memory.
+
+        Returns (new list, VlanBatchResult without result). Creating a
+        vlanId that exists with the same interfaceName, or deleting one that
+        does not exist, is skipped. A change without a vlanId, creating a
+        vlanId that exists with a different interfaceName, listing a vlanId
+        twice, or both creating and deleting it are conflicts.
+        """
+        index = OrderedDict((str(wireless_vlan.vlanId), wireless_vlan) \
+        for wireless_vlan in wireless_vlans)
+        created, deleted, skipped, conflicts = [], [], [], []
+
+        requested = {}
+        for action, params in [("create", params) for params in creates or []] + \
+                [("delete", params) for params in deletes or []]:
+            if params.get("vlanId") in (None, ""):
+                conflicts.append(("", "{} without vlanId".format(action)))
+                continue
+            vlanId = str(params["vlanId"])
+            if vlanId in requested:
+                conflicts.append((vlanId, "{} duplicates an earlier {}"
+                    .format(action, requested[vlanId])))
+                continue
+            requested[vlanId] = action
+
+            existing = index.get(vlanId)
+            if action == "create":
+                if not params.get("interfaceName"):
+                    conflicts.append((vlanId, "create needs an interfaceName"))
+                elif existing is None:
+                    index[vlanId] = Wireless_VLAN(None, wireless_vlan = params)
+                    created.append(vlanId)
+                elif existing.interfaceName == params["interfaceName"]:
+                    skipped.append((vlanId, "already exists"))
+                else:
+                    conflicts.append((vlanId, "exists with interfaceName {}"
+                        .format(existing.interfaceName)))
+            else:
+                if existing is None:
+                    skipped.append((vlanId, "does not exist"))
+                else:
+                    del index[vlanId]
+                    deleted.append(vlanId)
 
-        return deletion
+        return list(index.values()), \
+            VlanBatchResult(created, deleted, skipped, conflicts, None)
+
+    @classmethod
+    def snapshot(cls, wireless_vlans):
+        return [(str(wireless_vlan.vlanId), wireless_vlan.interfaceName) \
+        for wireless_vlan in wireless_vlans]
+
+    @classmethod
+    def batch(cls, dnacp, creates = None, deletes = None, verify = True,
+        timeout = 600):
+        """Apply many creates and deletes in a single read-modify-write.
+
+        Nothing is written when any change conflicts. The controller has no
+        conditional write for interface.info, so a change made by another
+        client between the read and the POST is overwritten. With verify
+        (the default) the write's task is waited for (up to timeout
+        seconds) and the list read once more; ConcurrentModification is
+        raised when a created VLAN is missing or a deleted one is back, i.e.
+        another write replaced this one. A change of another client that
+        this write replaced cannot be detected.
+        """
+        wireless_vlans = cls.get_all(dnacp, bypass_cache = True)
+        wireless_vlans, outcome = cls.plan_batch(wireless_vlans, creates, deletes)
+        if outcome.conflicts or not (outcome.created or outcome.deleted):
+            return outcome
+
+        result = dnacp.post("/api/v1/commonsetting/global/-1?key=interface.info", \
+        cls.interface_body(wireless_vlans))
+        outcome = outcome._replace(result = Task.from_response(dnacp, result))
+        if verify:
+            cls.verify_batch(dnacp, outcome, timeout)
+        return outcome
+
+    @classmethod
+    def verify_batch(cls, dnacp, outcome, timeout = 600):
+        """Wait for a batch's task and check that its changes are in the
+        list; raises ConcurrentModification when they are not
+        """
+        if isinstance(outcome.result, Task):
+            TaskTracker(dnacp, timeout = timeout).wait_all([outcome.result])
+            if not outcome.result.done or outcome.result.failed:
+                return outcome
+        vlanIds = set(vlanId for vlanId, _ in cls.snapshot(
+            cls.get_all(dnacp, bypass_cache = True)))
+        missing = [vlanId for vlanId in outcome.created if vlanId not in vlanIds]
+        back = [vlanId for vlanId in outcome.deleted if vlanId in vlanIds]
+        if missing or back:
+            raise ConcurrentModification(
+                "interface.info was overwritten: missing {}, still present {}"
+                .format(missing, back))
+        return outcome
 
     @classmethod
     def task_status(cls, dnacp, taskId):
-        api = "/api/v1/task{}".format(
-            taskId
-        )
-        return dnacp.get(api)
+        return dnacp.get(Task.api(taskId))
@@ -5,15 +5,54 @@ from dnacsdk.wlan import Wlan
 dnacp = Api(ip=DNAC_IP, username=DNAC_USERNAME, password=DNAC_PASSWORD)
 
 wlans = Wlan.get_all(dnacp)
+
+# Create many SSIDs, overlaying each row on the default settings
+results = Wlan.create_many(dnacp, [
+        {"ssid": "guest", "wlanType": "Guest", "authType": "open"},
+        {"ssid": "staff", "trafficType": "data"},
+    ])
+for result in results:
+    print(result.ssid, result.status, result.detail)
 """
 import sys
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from .task import Task
+
+
+# Outcome of one row of Wlan.create_many: status is "submitted", "skipped"
+# or "error"; task is the Task of the POST that carried the row
+WlanResult = namedtuple("WlanResult", "ssid status detail task")
+
 
 class Wlan(object):
 
+    create_batch_size = 50
+    create_workers = 4
+
     @classmethod
     def get_all(cls, dnacp):
         wlans = \
         dnacp.get("/api/v1/commonsetting/wlan/-1")
+        return cls.from_response(dnacp, wlans)
+
+    @classmethod
+    def iter_all(cls, dnacp):
+        """Yield the WLANs one at a time while the response is streamed
+        """
+        for wlan in dnacp.get_stream("/api/v1/commonsetting/wlan/-1"):
+            if wlan["instanceType"] == "wlan":
+                yield Wlan(dnacp, wlan = wlan)
+
+    @classmethod
+    async def get_all_async(cls, dnacp):
+        wlans = \
+        await dnacp.get("/api/v1/commonsetting/wlan/-1")
+        return cls.from_response(dnacp, wlans)
+
+    @classmethod
+    def from_response(cls, dnacp, wlans):
         wlans = wlans["response"]
         validwlans=[]
         for wlan in wlans:
@@ -32,57 +71,176 @@ class Wlan(object):
             sys.exit()
 
     @classmethod
-    def create(self, dnacp, create_params = None):
-        body =[
-        {
+    def create_body(cls, create_params):
+        return [cls.setting(create_params, strict = False)]
+
+    @classmethod
+    def setting(cls, create_params, strict = True):
+        """Return the commonsetting entry for one SSID: the defaults below
+        with every other field of create_params laid over them. String values
+        (as read from CSV) are converted to the type of the default.
+
+        Unknown fields raise ValueError; with strict=False they are dropped
+        with a warning instead, as create() always did.
+        """
+        value = {
+            "ssid":create_params["ssid"],
+            "profileName":"",
+            "wlanType":"Enterprise",
+            "authType":"wpa2_enterprise",
+            "authServer":"auth_ise",
+            "authSecServer":"",
+            "redirectUrl":"",
+            "peerIp":"",
+            "isEnabled":True,
+            "isEmailReqd":False,
+            "isFabric":True,
+            "fabricId":None,
+            "isFastLaneEnabled":False,
+            "isMacFilteringEnabled":False,
+            "trafficType":"voicedata",
+            "radioPolicy":0,
+            "wlanBandSelectEnable":False,
+            "scalableGroupTag":"",
+            "passphrase":"",
+            "portalType":"",
+            "portalName":"",
+            "redirectUrlType":"",
+            "externalAuthIpAddress":"",
+            "isBroadcastSSID":True,
+            "fastTransition":"ADAPTIVE"
+        }
+        for field, given in create_params.items():
+            if field == "ssid":
+                continue
+            if field not in value:
+                if strict:
+                    raise ValueError("Unknown WLAN setting: {}".format(field))
+                print("Ignoring unknown WLAN setting: {}".format(field))
+                continue
+            value[field] = cls.coerce(value[field], given)
+
+        return {
             "instanceType":"wlan",
             "namespace":"wlan",
             "type":"wlan.setting",
             "key":"wlan.info." + create_params["ssid"],
-            "value":
-                [
-                    {
-                        "ssid":create_params["ssid"],
-                        "profileName":"",
-                        "wlanType":"Enterprise",
-                        "authType":"wpa2_enterprise",
-                        "authServer":"auth_ise",
-                        "authSecServer":"",
-                        "redirectUrl":"",
-                        "peerIp":"",
-                        "isEnabled":True,
-                        "isEmailReqd":False,
-                        "isFabric":True,
-                        "fabricId":None,
-                        "isFastLaneEnabled":False,
-                        "isMacFilteringEnabled":False,
-                        "trafficType":"voicedata",
-                        "radioPolicy":0,
-                        "wlanBandSelectEnable":False,
-                        "scalableGroupTag":"",
-                        "passphrase":"",
-                        "portalType":"",
-                        "portalName":"",
-                        "redirectUrlType":"",
-                        "externalAuthIpAddress":"",
-                        "isBroadcastSSID":True,
-                        "fastTransition":"ADAPTIVE"
-                    }
-                ],
-                "groupUuid":"-1"
-            }
-        ]
+            "value": [value],
+            "groupUuid":"-1"
+        }
 
+    @classmethod
+    def coerce(cls, default, given):
+        if not isinstance(given, str):
+            return given
+        if isinstance(default, bool):
+            if given.strip().lower() in ("true", "yes", "1"):
+                return True
+            if given.strip().lower() in ("false", "no", "0"):
+                return False
+            raise ValueError("Expected true or false, got {}".format(given))
+        if isinstance(default, int):
+            return int(given)
+        return given
+
+    @classmethod
+    def create(self, dnacp, create_params = None):
         creation=""
         try:
             creation = \
             dnacp.post("/api/v1/commonsetting/wlan/-1", \
-            body)
+            self.create_body(create_params))
+        except Exception as e:
+            creation = e
+            print(e)
+
+        return Task.from_response(dnacp, creation)
+
+    @classmethod
+    async def create_async(cls, dnacp, create_params = None):
+        creation=""
+        try:
+            creation = \
+            await dnacp.post("/api/v1/commonsetting/wlan/-1", \
+            cls.create_body(create_params))
         except Exception as e:
             creation = e
             print(e)
 
-        return creation
+        return Task.from_response(dnacp, creation)
+
+    @classmethod
+    def create_many(cls, dnacp, rows, batch_size = None, max_workers = None,
+        skip_existing = True):
+        """Create one SSID per row, packing up to batch_size SSIDs into each
+        commonsetting POST and sending at most max_workers POSTs at once.
+
+        Rows without an ssid, with unknown or invalid fields, or repeating an
+        ssid of an earlier row are reported as errors and not sent. SSIDs that
+        already exist on the controller are skipped unless skip_existing is
+        False. Returns one WlanResult per row, in row order; rerunning the
+        same file after a partial failure only sends the missing SSIDs.
+        """
+        batch_size = batch_size or cls.create_batch_size
+        max_workers = max_workers or cls.create_workers
+
+        existing = set()
+        if skip_existing:
+            existing = set(wlan.ssid for wlan in cls.get_all(dnacp))
+
+        results = []
+        pending = []
+        seen = set()
+        for row in rows:
+            # Empty cells keep the default
+            row = dict((field, value) for field, value in row.items()
+                if value is not None and value != "")
+            ssid = row.get("ssid")
+            if not ssid:
+                results.append(WlanResult(None, "error", "missing ssid", None))
+                continue
+            if ssid in seen:
+                results.append(WlanResult(ssid, "error", "duplicate ssid", None))
+                continue
+            seen.add(ssid)
+            if ssid in existing:
+                results.append(WlanResult(ssid, "skipped", "already exists", None))
+                continue
+            try:
+                setting = cls.setting(row)
+            except ValueError as e:
+                results.append(WlanResult(ssid, "error", str(e), None))
+                continue
+            pending.append((len(results), setting))
+            results.append(None)
+
+        batches = [pending[start:start + batch_size]
+            for start in range(0, len(pending), batch_size)]
+
+        def submit(batch):
+            return dnacp.post("/api/v1/commonsetting/wlan/-1",
+                [setting for _, setting in batch])
+
+        with ThreadPoolExecutor(max_workers = max_workers) as pool:
+            futures = [(batch, pool.submit(submit, batch)) for batch in batches]
+            for batch, future in futures:
+                try:
+                    creation = Task.from_response(dnacp, future.result())
+                except Exception as e:
+                    creation = e
+                    print(e)
+
+                if isinstance(creation, Task):
+                    status, detail, task = "submitted", None, creation
+                elif isinstance(creation, dict) and "error" in creation:
+                    status, detail, task = "error", creation["error"], None
+                else:
+                    status, detail, task = "error", str(creation), None
+                for position, setting in batch:
+                    results[position] = WlanResult(setting["value"][0]["ssid"],
+                        status, detail, task)
+
+        return results
 
     @classmethod
     def delete(self, dnacp, delete_params = None):
@@ -95,14 +253,19 @@ class Wlan(object):
             print(e)
 
 
-        return deletion
+        return Task.from_response(dnacp, deletion)
 
     @classmethod
-    def task_status(cls, dnacp, taskId):
-        api = "/api/v1/task{}".format(
-            taskId
-        )
-        return dnacp.get(api)
+    async def delete_async(cls, dnacp, delete_params = None):
+        try:
+            deletion = \
+            await dnacp.delete("/api/v1/commonsetting/wlan/-1/" + delete_params["key"])
+        except Exception as e:
+            deletion = e
+            print(e)
 
+        return Task.from_response(dnacp, deletion)
 
-        return creation
+    @classmethod
+    def task_status(cls, dnacp, taskId):
+        return dnacp.get(Task.api(taskId))
@@ -31,6 +31,7 @@ urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 DNAC_IP = os.environ.get("DNAC_IP")
 DNAC_USERNAME = os.environ.get("DNAC_USERNAME")
 DNAC_PASSWORD = os.environ.get("DNAC_PASSWORD")
+DNAC_TOKEN_CACHE = os.environ.get("DNAC_TOKEN_CACHE")
 
 if DNAC_IP is None or DNAC_USERNAME is None or DNAC_PASSWORD is None:
     print("DNA Center details must be set via environment variables before running.")
@@ -40,7 +41,8 @@ if DNAC_IP is None or DNAC_USERNAME is None or DNAC_PASSWORD is None:
     print("")
     exit("1")
 
-dnacp = Api(ip=DNAC_IP, username=DNAC_USERNAME, password=DNAC_PASSWORD)
+dnacp = Api(ip=DNAC_IP, username=DNAC_USERNAME, password=DNAC_PASSWORD,
+            token_cache=DNAC_TOKEN_CACHE, cache=True, rate_limit=True)
 
 @click.group()
 def cli():
@@ -49,7 +51,8 @@ def cli():
     pass
 
 @click.command()
-def device_list():
+@click.option("--page-size", default=500, help="Devices fetched per request.")
+def device_list(page_size):
     """Retrieve and return network devices list.
 
         Returns the hostname, management IP, and family of each device.
@@ -62,18 +65,19 @@ def device_list():
     click.secho("Retrieving the devices.")
 
     from dnacsdk.networkDevice import NetworkDevice
-    devices = NetworkDevice.get_all(dnacp)
 
-    headers = ["Hostname", "Management IP", "Family","ID"]
-    table = list()
+    # Rows are printed as each page arrives, so column widths are fixed
+    # instead of being computed over the whole table.
+    row = "{:<40} {:<16} {:<24} {}"
+    click.echo(row.format("Hostname", "Management IP", "Family", "ID"))
 
-    for device in devices:
-        tr = [device.hostname, device.managementIpAddress, device.family, device.id]
-        table.append(tr)
-    try:
-        click.echo(tabulate.tabulate(table, headers, tablefmt="fancy_grid"))
-    except UnicodeEncodeError:
-        click.echo(tabulate.tabulate(table, headers, tablefmt="grid"))
+    for device in NetworkDevice.iter_all(dnacp, page_size = page_size):
+        click.echo(row.format(
+            str(device.hostname),
+            str(device.managementIpAddress),
+            str(device.family),
+            device.id
+        ))
 
 @click.command()
 @click.argument("device")
@@ -165,8 +169,10 @@ def template_list():
 @click.command()
 @click.option("--template", help="Name of the template to deploy")
 @click.option("--target", help="Hostname of target network device.")
+@click.option("--wait", is_flag=True, help="Follow the deployment until it finishes.")
+@click.option("--timeout", default=600, help="Seconds to follow the deployment with --wait.")
 @click.argument("parameters", nargs=-1)
-def deploy(template, target, parameters):
+def deploy(template, target, wait, timeout, parameters):
     """Deploy a template with DNA Center.
 
         Provide all template parameters and their values as arguements in the format of: "PARAMTER=VALUE"
@@ -196,9 +202,109 @@ def deploy(template, target, parameters):
                                     params = deploy_params
                                 )
 
-    print("Deployment Status: {}".format(
-        Template.deployment_status(dnacp, deployment)["devices"][0]["status"])
-    )
+    if wait:
+        wait_for_deployments([deployment], timeout)
+    else:
+        print("Deployment Status: {}".format(
+            Template.deployment_status(dnacp, deployment)["devices"][0]["status"])
+        )
+
+
+def wait_for_deployments(deployments, timeout):
+    """Print deployment status changes until every deployment finishes
+    """
+    from dnacsdk.templateProgrammer import DeploymentTracker
+
+    tracker = DeploymentTracker(dnacp, timeout = timeout)
+    for event in tracker.track(deployments):
+        if event.deviceId is None:
+            print("Deployment {}: {}".format(event.deploymentId, event.status))
+        else:
+            print("Deployment {} device {}: {}{}".format(event.deploymentId,
+                event.deviceId, event.status,
+                " ({})".format(event.detail) if event.detail else ""))
+    for deployment in tracker.unfinished:
+        click.secho("Deployment {}: still running after {}s".format(deployment, timeout), fg="yellow")
+
+
+@click.command()
+@click.option("--template", required=True, help="Name of the template to deploy")
+@click.option("--file", "targets_file", required=True, type=click.Path(exists=True),
+    help="CSV/JSON/YAML file with a 'target' column plus one column per template parameter.")
+@click.option("--batch-size", default=100, help="Targets sent per deploy call.")
+@click.option("--wait", is_flag=True, help="Follow the deployments until they finish.")
+@click.option("--timeout", default=600, help="Seconds to follow the deployments with --wait.")
+def deploy_bulk(template, targets_file, batch_size, wait, timeout):
+    """Deploy a template to many devices with DNA Center.
+
+        Each row of the file names a target (hostname or management IP) and
+        its template parameters. All targets are resolved through one device
+        listing and deployed in as few calls as possible. Rows without a
+        target, with an unknown device, with empty parameters or with
+        parameters that do not match the template are listed and skipped;
+        the other rows are deployed.
+
+        Example command:
+
+          ./wlanmgmt.py deploy_bulk --template VLANSetup --file targets.csv
+    """
+    click.secho("Attempting bulk deployment.")
+
+    from dnacsdk import util
+    from dnacsdk.networkDevice import DeviceIndex
+    from dnacsdk.templateProgrammer import Template
+
+    rows = util.load_rows(targets_file)
+    template = Template(dnacp, name = template)
+
+    expected = set(template.input_params)
+
+    index = DeviceIndex.shared(dnacp).load()
+    targets = list()
+    skipped = list()
+    for number, row in enumerate(rows, 1):
+        row = dict(row)
+        target = row.pop("target", None)
+        problems = list()
+        device = None
+        if not target:
+            problems.append("missing target")
+        else:
+            device = index.cached("hostname", target) or \
+                index.cached("managementIpAddress", target)
+            if device is None:
+                problems.append("no such device")
+        missing = expected - set(name for name, value in row.items()
+            if value is not None and value != "")
+        if missing:
+            problems.append("missing parameters: {}".format(", ".join(sorted(missing))))
+        unexpected = set(row) - expected
+        if unexpected:
+            problems.append("unknown parameters: {}".format(", ".join(sorted(unexpected))))
+        if problems:
+            skipped.append([number, target or "", "; ".join(problems)])
+            continue
+        targets.append((device.managementIpAddress, row))
+
+    if skipped:
+        click.secho("Skipping {} of {} rows:".format(len(skipped), len(rows)), fg="red")
+        headers = ["Row", "Target", "Problem"]
+        try:
+            click.echo(tabulate.tabulate(skipped, headers, tablefmt="fancy_grid"))
+        except UnicodeEncodeError:
+            click.echo(tabulate.tabulate(skipped, headers, tablefmt="grid"))
+    if not targets:
+        click.secho("Nothing to deploy.", fg="red")
+        exit("1")
+
+    deployments = template.deploy_many(dnacp, targets, batch_size = batch_size)
+
+    print("Deployed to {} targets in {} calls.".format(len(targets), len(deployments)))
+    for deployment in deployments:
+        print("Deployment ID: {}".format(deployment))
+
+    if wait:
+        wait_for_deployments(deployments, timeout)
 
 
 @click.command()
@@ -280,6 +386,61 @@ def delete_wireless_vlan(parameters):
     print("Delete Status: {}".format(deletion))
 
 
+@click.command()
+@click.argument("changes_file", type=click.Path(exists=True))
+@click.option("--verify/--no-verify", default=True,
+    help="Wait for the update and check that no other write replaced it.")
+def wireless_vlan_batch(changes_file, verify):
+    """create and delete many Wireless VLANs at once
+
+        The CSV/JSON/YAML file has one row per change with the columns
+        action (create or delete), vlanId and interfaceName (create only).
+        All changes are applied in a single update of the VLAN list; nothing
+        is written if any change conflicts. By default the update is waited
+        for and the list read again to check that no other write replaced it.
+
+        Example command:
+
+          ./wlanmgmt.py wireless_vlan_batch vlans.csv
+    """
+    click.secho("Attempting wireless vlan batch update.")
+
+    from dnacsdk import util
+    from dnacsdk.exceptions import ConcurrentModification
+    from dnacsdk.wireless_vlan import Wireless_VLAN
+
+    creates = list()
+    deletes = list()
+    for row in util.load_rows(changes_file):
+        row = dict(row)
+        action = row.pop("action", "create").strip().lower()
+        if action == "delete":
+            deletes.append(row)
+        else:
+            creates.append(row)
+
+    try:
+        outcome = Wireless_VLAN.batch(dnacp, creates = creates, deletes = deletes,
+            verify = verify)
+    except ConcurrentModification as e:
+        click.secho(str(e), fg="red")
+        exit("1")
+
+    headers = ["VLAN ID", "Result"]
+    table = [[vlanId, "created"] for vlanId in outcome.created] + \
+        [[vlanId, "deleted"] for vlanId in outcome.deleted] + \
+        [[vlanId, "skipped: " + reason] for vlanId, reason in outcome.skipped] + \
+        [[vlanId, "conflict: " + reason] for vlanId, reason in outcome.conflicts]
+    try:
+        click.echo(tabulate.tabulate(table, headers, tablefmt="fancy_grid"))
+    except UnicodeEncodeError:
+        click.echo(tabulate.tabulate(table, headers, tablefmt="grid"))
+
+    if outcome.conflicts:
+        click.secho("Conflicts found, nothing was changed.", fg="red")
+    print("Batch Status: {}".format(outcome.result))
+
+
 @click.command()
 def site_list():
     """Retrieve and return sites list.
@@ -322,13 +483,15 @@ def profile_list():
     click.secho("Retrieving the profiles.")
 
     from dnacsdk.profile import Profile
-    profiles= Profile.get_all(dnacp)
+    profiles= Profile.get_all(dnacp, prefetch_sites = True)
 
     headers = ["Name", "Namespace", "ID", "Assigned Sites"]
     table = list()
 
     for profile in profiles:
-        tr = [profile.name, profile.namespace, profile.id, profile.sites]
+        sites = "".join(["name: {}\nsiteid: {}\n\n".format(site.name, site.uuid)
+            for site in profile.sites])
+        tr = [profile.name, profile.namespace, profile.id, sites]
         table.append(tr)
     try:
         click.echo(tabulate.tabulate(table, headers, tablefmt="fancy_grid"))
@@ -490,6 +653,54 @@ def create_wlan(parameters):
     print("Create Status: {}".format(creation))
 
 
+@click.command()
+@click.argument("wlans_file", type=click.Path(exists=True))
+@click.option("--batch-size", default=50, help="SSIDs sent per create call.")
+@click.option("--workers", default=4, help="Create calls in flight at once.")
+@click.option("--wait", is_flag=True, help="Follow the create tasks until they finish.")
+@click.option("--timeout", default=600, help="Seconds to follow the tasks with --wait.")
+def create_wlan_bulk(wlans_file, batch_size, workers, wait, timeout):
+    """create many wlans from a file
+
+        The CSV/JSON/YAML file has one row per SSID with an ssid column plus
+        any wlan settings to change from the defaults (e.g. wlanType,
+        authType, trafficType). Empty cells keep the default. SSIDs that
+        already exist are skipped, so a failed run can simply be repeated.
+
+        Example command:
+
+          ./wlanmgmt.py create_wlan_bulk wlans.csv --wait
+    """
+    click.secho("Attempting bulk wlan creation.")
+
+    from dnacsdk import util
+    from dnacsdk.task import TaskTracker
+    from dnacsdk.wlan import Wlan
+
+    results = Wlan.create_many(dnacp, util.load_rows(wlans_file),
+        batch_size = batch_size, max_workers = workers)
+
+    tasks = list(dict((result.task.id, result.task) for result in results
+        if result.task is not None).values())
+    if wait and tasks:
+        tracker = TaskTracker(dnacp, timeout = timeout)
+        tracker.wait_all(tasks)
+
+    headers = ["SSID", "Status", "Detail", "Task"]
+    table = []
+    for result in results:
+        status, detail = result.status, result.detail
+        if result.task is not None and result.task.done:
+            status = "failed" if result.task.failed else "created"
+            detail = result.task.failureReason
+        table.append([result.ssid, status, detail or "",
+            result.task.id if result.task is not None else ""])
+    try:
+        click.echo(tabulate.tabulate(table, headers, tablefmt="fancy_grid"))
+    except UnicodeEncodeError:
+        click.echo(tabulate.tabulate(table, headers, tablefmt="grid"))
+
+
 @click.command()
 @click.argument("parameters", nargs=-1)
 def delete_wlan(parameters):
@@ -565,24 +776,171 @@ def unassign_device_site(parameters):
 
     print("Unassignment Status: {}".format(unassignment))
 
+
+@click.command()
+@click.argument("mapping_file", type=click.Path(exists=True))
+@click.option("--workers", default=8, help="Assignment calls in flight at once.")
+@click.option("--dry-run", is_flag=True, help="Only show what would be sent.")
+@click.option("--wait", is_flag=True, help="Follow the assignment tasks until they finish.")
+@click.option("--timeout", default=600, help="Seconds to follow the tasks with --wait.")
+@click.option("--failed", "failed_file", type=click.Path(),
+    help="Write the rows that did not go through to this file, for a rerun.")
+def assign_bulk(mapping_file, workers, dry_run, wait, timeout, failed_file):
+    """assign or unassign many profiles and devices to sites
+
+        The CSV/JSON/YAML file has one row per pair with a profile or a
+        device column (name, hostname, IP or id), a site column (name,
+        hierarchy or id) and an optional action column (assign or unassign).
+        Pairs that are already in the requested state are skipped.
+
+        Example command:
+
+          ./wlanmgmt.py assign_bulk mapping.csv --wait --failed retry.csv
+    """
+    click.secho("Attempting bulk assignment.")
+
+    from dnacsdk import util
+    from dnacsdk.assignment import BulkAssignment
+    from dnacsdk.task import TaskTracker
+
+    results = BulkAssignment(dnacp, max_workers = workers).run(
+        util.load_rows(mapping_file), dry_run = dry_run)
+
+    tasks = [result.task for result in results if result.task is not None]
+    if wait and tasks:
+        TaskTracker(dnacp, timeout = timeout).wait_all(tasks)
+
+    headers = ["Member", "Site", "Action", "Status", "Detail"]
+    table = []
+    for result in results:
+        status, detail = result.status, result.detail
+        if result.task is not None and result.task.done:
+            status = "failed" if result.task.failed else "done"
+            detail = result.task.failureReason
+        table.append([
+            getattr(result.member, "name", None) or \
+                getattr(result.member, "hostname", result.member),
+            getattr(result.site, "groupNameHierarchy", result.site),
+            result.action, status, detail or ""])
+    try:
+        click.echo(tabulate.tabulate(table, headers, tablefmt="fancy_grid"))
+    except UnicodeEncodeError:
+        click.echo(tabulate.tabulate(table, headers, tablefmt="grid"))
+
+    failed = BulkAssignment.failed_rows(results)
+    if failed_file and failed:
+        util.save_rows(failed_file, failed)
+        click.secho("{} rows failed, written to {}.".format(len(failed), failed_file), fg="red")
+
+
+@click.command()
+@click.argument("desired_file", type=click.Path(exists=True))
+@click.option("--dry-run", is_flag=True, help="Only show the plan.")
+@click.option("--workers", default=8, help="Operations in flight at once.")
+@click.option("--timeout", default=600, help="Seconds to wait for the tasks of each phase.")
+def reconcile(desired_file, dry_run, workers, timeout):
+    """bring wlans, wireless vlans and profiles to a desired state
+
+        The JSON/YAML file lists the wlans, wireless_vlans and profiles that
+        should exist (or, with "state: absent", should not). Only the
+        differences to the current state are applied, in dependency order.
+
+        Example command:
+
+          ./wlanmgmt.py reconcile desired.yaml --dry-run
+    """
+    from dnacsdk import util
+    from dnacsdk.reconcile import Reconciler
+
+    reconciler = Reconciler(dnacp, max_workers = workers, timeout = timeout)
+    try:
+        plan = reconciler.plan(util.load_document(desired_file))
+    except ValueError as e:
+        click.secho(str(e), fg="red")
+        exit("1")
+
+    if not plan:
+        click.secho("Nothing to do, the controller matches the desired state.", fg="green")
+        return
+    for operation in plan:
+        print(operation)
+    if dry_run:
+        return
+
+    click.secho("Applying {} operations.".format(len(plan)))
+    for result in reconciler.apply(plan):
+        print("{}: {}{}".format(result.operation, result.status,
+            " ({})".format(result.detail) if result.detail else ""))
+
+
+@click.command()
+@click.option("--profile", "profiles", multiple=True, help="Profile to remove (repeatable).")
+@click.option("--wlan", "wlans", multiple=True, help="Extra SSID to remove (repeatable).")
+@click.option("--vlan", "vlans", multiple=True, help="Extra wireless VLAN ID to remove (repeatable).")
+@click.option("--dry-run", is_flag=True, help="Only show the jobs and their order.")
+@click.option("--workers", default=8, help="Jobs in flight at once.")
+@click.option("--timeout", default=600, help="Seconds to wait for each task.")
+def teardown(profiles, wlans, vlans, dry_run, workers, timeout):
+    """remove profiles with their site assignments, wlans and wireless vlans
+
+        The profiles' sites are unassigned, then the profiles are deleted,
+        then the SSIDs and wireless VLANs they use, unless another profile
+        still uses them. Independent steps run in parallel.
+
+        Example command:
+
+          ./wlanmgmt.py teardown --profile Guest --profile Event
+    """
+    from dnacsdk.teardown import Teardown
+
+    remover = Teardown(dnacp, max_workers = workers, timeout = timeout)
+    try:
+        scheduler = remover.plan(profiles = profiles, wlans = wlans, wireless_vlans = vlans)
+    except ValueError as e:
+        click.secho(str(e), fg="red")
+        exit("1")
+
+    for kind, key, reason in remover.kept:
+        click.secho("Keeping {} {}: {}".format(kind, key, reason), fg="yellow")
+    if dry_run:
+        for job in scheduler.jobs.values():
+            print("{}{}".format(job.name,
+                " (after {})".format(", ".join(job.after)) if job.after else ""))
+        return
+
+    click.secho("Running {} teardown jobs.".format(len(scheduler.jobs)))
+    report = remover.run(scheduler)
+    for result in report.results.values():
+        click.secho("{}: {}{}".format(result.name, result.status,
+            " ({})".format(result.detail) if result.detail else ""),
+            fg="red" if result.status != "done" else None)
+    print("Elapsed: {:.1f}s, critical path: {:.1f}s ({})".format(report.elapsed,
+        report.critical_path_seconds, " -> ".join(report.critical_path)))
+
 cli.add_command(deploy)
+cli.add_command(deploy_bulk)
 cli.add_command(device_list)
 cli.add_command(interface_list)
 cli.add_command(template_list)
 cli.add_command(wireless_vlan_list)
 cli.add_command(create_wireless_vlan)
 cli.add_command(delete_wireless_vlan)
+cli.add_command(wireless_vlan_batch)
 cli.add_command(site_list)
 cli.add_command(profile_list)
 cli.add_command(create_profile)
 cli.add_command(delete_profile)
 cli.add_command(wlan_list)
 cli.add_command(create_wlan)
+cli.add_command(create_wlan_bulk)
 cli.add_command(delete_wlan)
 cli.add_command(assign_profile_site)
 cli.add_command(unassign_profile_site)
 cli.add_command(assign_device_site)
 cli.add_command(unassign_device_site)
+cli.add_command(assign_bulk)
+cli.add_command(reconcile)
+cli.add_command(teardown)
 
 if __name__ == '__main__':
     cli()